@@ -0,0 +1,67 @@
+"""Настройка соединений с БД и повтор записи при блокировке.
+
+При каждом подключении включаются WAL и прагмы из SQLITE_PRAGMAS:
+читатели не ждут пишущего, а пишущие ждут друг друга до таймаута
+из DATABASES['OPTIONS']['timeout']. Транзакция, начатая чтением,
+при попытке записать может сразу получить «database is locked»
+без ожидания, поэтому пишущие view повторяются retry_on_locked.
+"""
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+@receiver(request_started)
+def close_unusable_connections(**kwargs):
+    """Проверяет соединения, оставшиеся от прошлых запросов
+    (CONN_MAX_AGE), и закрывает оборванные до первого запроса к БД."""
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            logger.warning('Соединение %s оборвано', connection.alias)
+            connection.close()
+
+
+def is_locked(error):
+    return 'database is locked' in str(error)
+
+
+def retry_on_locked(view):
+    """Повторяет view при блокировке БД с растущей паузой.
+
+    Ставится над transaction.atomic: каждая попытка — новая транзакция.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.DB_LOCK_RETRIES):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as error:
+                if not is_locked(error):
+                    raise
+                logger.warning(
+                    'БД заблокирована, попытка %s: %s', attempt + 1, view
+                )
+                time.sleep(settings.DB_LOCK_RETRY_DELAY * 2 ** attempt)
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,160 @@
+"""Отдача файлов из MEDIA_ROOT.
+
+View только проверяет путь и заголовки условного запроса, а сами байты
+при MEDIA_SENDFILE передаёт фронт-серверу: 'x-accel-redirect' для nginx
+(внутренний location MEDIA_ACCEL_PREFIX с alias на MEDIA_ROOT) или
+'x-sendfile' для Apache и lighttpd. Без него файл отдаёт FileResponse,
+который WSGI-сервер может передать через wsgi.file_wrapper и sendfile;
+диапазоны (Range, If-Range) поддерживаются и здесь, чтобы локально
+работали видео и докачка.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+BYTES_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def resolve(root, path):
+    """Путь к файлу в каталоге root и его stat или Http404.
+
+    Скрытые файлы (в том числе временные .upload-* хранилища картинок)
+    и всё вне root не отдаются.
+    """
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        fullpath = safe_join(root, path)
+        info = os.stat(fullpath)
+    except (ValueError, OSError):
+        raise Http404
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404
+    return fullpath, info
+
+
+def file_etag(info):
+    return f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+
+
+def byte_range(request, etag, info):
+    """(начало, конец) запрошенного диапазона, None для всего файла
+    или False, если диапазон невыполним."""
+    header = request.META.get('HTTP_RANGE')
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and (
+        parse_http_date_safe(if_range) != int(info.st_mtime)
+    ):
+        return None
+    match = BYTES_RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Несколько диапазонов сразу не поддерживаются: отдаём файл целиком.
+        return None
+    first, last = match.groups()
+    size = info.st_size
+    if first:
+        start, end = int(first), min(int(last or size - 1), size - 1)
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def ranged(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def serve(request, path):
+    fullpath, info = resolve(settings.MEDIA_ROOT, path)
+    return respond(
+        request, fullpath, info,
+        f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}', sendfile=path
+    )
+
+
+def respond(request, fullpath, info, cache_control, sendfile=None,
+            content_type=None, encoding=None):
+    """Ответ с файлом fullpath с учётом условных заголовков и Range.
+
+    sendfile — путь файла для MEDIA_SENDFILE; без него файл всегда
+    отдаёт Django. content_type и encoding по умолчанию угадываются
+    по имени файла.
+    """
+    etag = file_etag(info)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(info.st_mtime)
+    )
+    if response is None:
+        if content_type is None:
+            content_type, encoding = mimetypes.guess_type(fullpath)
+        response = deliver(
+            request, fullpath, etag, info,
+            content_type or 'application/octet-stream', encoding, sendfile
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(info.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def deliver(request, fullpath, etag, info, content_type, encoding,
+            sendfile):
+    backend = settings.MEDIA_SENDFILE if sendfile is not None else None
+    if backend == 'x-accel-redirect':
+        # Диапазоны и If-Range nginx обрабатывает сам.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(sendfile)
+        )
+        return response
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+        return response
+    if backend:
+        raise ValueError(f'Неизвестный MEDIA_SENDFILE: {backend}')
+    span = byte_range(request, etag, info)
+    if span is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{info.st_size}'
+        return response
+    if span is None:
+        response = FileResponse(open(fullpath, 'rb'))
+        # FileResponse угадал бы тип по имени, а у сжатого варианта
+        # это .gz или .br.
+        response['Content-Type'] = content_type
+    else:
+        start, end = span
+        response = StreamingHttpResponse(
+            ranged(open(fullpath, 'rb'), start, end - start + 1),
+            status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{info.st_size}'
+        response['Content-Length'] = end - start + 1
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return response
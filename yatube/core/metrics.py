@@ -0,0 +1,161 @@
+"""Метрики запросов: число и время SQL, время шаблонов и ответа.
+
+Гистограммы собираются в памяти процесса по имени view
+(resolver_match.view_name) и отдаются в текстовом формате Prometheus.
+У каждого процесса сервера свои гистограммы.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.template.backends import django as django_backend
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # view -> [счётчики корзин..., сумма, количество]
+        self.series = {}
+
+    def observe(self, view, value):
+        with self.lock:
+            series = self.series.setdefault(
+                view, [0] * len(self.buckets) + [0, 0]
+            )
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = {view: list(row) for view, row in self.series.items()}
+        for view, row in sorted(series.items()):
+            label = 'view="{}"'.format(
+                view.replace('\\', r'\\').replace('"', r'\"')
+            )
+            total = 0
+            for bound, count in zip(self.buckets, row):
+                total += count
+                lines.append(
+                    f'{self.name}_bucket{{{label},le="{bound}"}} {total}'
+                )
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {row[-1]}')
+            lines.append(f'{self.name}_sum{{{label}}} {row[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {row[-1]}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_seconds', 'Время ответа.', SECONDS_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'yatube_db_queries', 'Число SQL-запросов на ответ.', QUERIES_BUCKETS
+)
+DB_SECONDS = Histogram(
+    'yatube_db_seconds', 'Время SQL-запросов на ответ.', SECONDS_BUCKETS
+)
+TEMPLATE_SECONDS = Histogram(
+    'yatube_template_seconds', 'Время вывода шаблонов на ответ.',
+    SECONDS_BUCKETS
+)
+HISTOGRAMS = (REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, TEMPLATE_SECONDS)
+
+
+class Timings:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+    def __enter__(self):
+        _local.timings = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.timings = None
+
+    def query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def record(self, view):
+        total = self.total
+        REQUEST_SECONDS.observe(view, total)
+        DB_QUERIES.observe(view, self.queries)
+        DB_SECONDS.observe(view, self.db)
+        TEMPLATE_SECONDS.observe(view, self.template)
+        return total
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        timings = current()
+        if timings is None:
+            return super().render(context, request)
+        # render_to_string внутри шаблона не считается дважды.
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время вывода шаблонов."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
@@ -0,0 +1,81 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.shortcuts import render
+
+from . import metrics, routers
+
+
+class MetricsMiddleware:
+    """Замеряет запрос и пишет итог в гистограммы и Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.Timings() as timings, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.query))
+            response = self.get_response(request)
+        match = request.resolver_match
+        total = timings.record(match.view_name if match else 'unresolved')
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db * 1000:.1f};'
+                f'desc="{timings.queries} queries"',
+                f'tpl;dur={timings.template * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        return response
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения лент на реплику, см. core/routers.py."""
+    SAFE_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request()
+        try:
+            response = self.get_response(request)
+            wrote = routers.wrote()
+        finally:
+            routers.start_request()
+        if wrote and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.use_replica(
+            request.method in self.SAFE_METHODS
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        )
+
+
+class UploadLimitMiddleware:
+    """Отвечает 413 на загрузку больше UPLOAD_MAX_REQUEST_SIZE по
+    Content-Length, не читая тело. Загрузку чуть больше
+    UPLOAD_MAX_IMAGE_SIZE дочитывает posts.uploads, и пользователь видит
+    ошибку формы, а не оборванное соединение."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > settings.UPLOAD_MAX_REQUEST_SIZE:
+            return render(request, 'core/413.html', {
+                'limit': settings.UPLOAD_MAX_IMAGE_SIZE,
+            }, status=413)
+        return self.get_response(request)
@@ -0,0 +1,70 @@
+"""Чтение лент с реплики, запись и всё остальное — в основную БД.
+
+ReplicaMiddleware отмечает запросы, которые можно отдать с реплики:
+GET/HEAD к view из REPLICA_VIEWS от клиента без куки
+REPLICA_STICKY_COOKIE. После успешного запроса с записью в БД (любым
+методом: подписка, например, идёт через GET) кука
+на REPLICA_STICKY_SECONDS отправляет все чтения клиента в основную
+БД, и он сразу видит свой пост или комментарий. Если в запросе была
+запись, дальнейшие чтения этого запроса тоже идут в основную БД.
+Реплика отстаёт не больше чем на REPLICA_STICKY_SECONDS, поэтому
+ленты, изменённые за это время, читаются из основной БД и для всех
+остальных (posts/feed_cache.py): иначе страница до записи попала бы
+в кеш под новой версией ленты.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_local = threading.local()
+
+
+def use_replica(enabled):
+    _local.replica = enabled
+
+
+def start_request():
+    _local.replica = False
+    _local.wrote = False
+
+
+def wrote():
+    """Была ли в запросе запись в БД, кроме версий лент."""
+    return getattr(_local, 'wrote', False)
+
+
+def replica_alias():
+    if not settings.DATABASE_REPLICAS or not getattr(
+        _local, 'replica', False
+    ):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def is_feed_version(model):
+    # Версии лент читаются только из основной БД: версия с отстающей
+    # реплики выдала бы старую страницу за новую.
+    return model._meta.label == 'posts.FeedVersion'
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if is_feed_version(model):
+            return DEFAULT_DB_ALIAS
+        return replica_alias() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Дальше в этом запросе читаем своё же.
+        if not is_feed_version(model):
+            use_replica(False)
+            _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной БД.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
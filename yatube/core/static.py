@@ -0,0 +1,139 @@
+"""Статика с хешами в именах и заранее сжатыми копиями.
+
+collectstatic через CompressedManifestStorage пишет файлы с хешем
+содержимого в имени (img/logot.3f2a….png) и рядом с текстовыми — .gz и,
+если установлен brotli, .br. serve выбирает сжатую копию по
+Accept-Encoding и отдаёт файлы с хешем как immutable: браузер больше
+не запрашивает их вовсе, а новая версия файла получает новое имя.
+Остальные файлы браузер перепроверяет по ETag.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.files.base import ContentFile
+from django.http import Http404
+
+from .media import resolve, respond
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Картинки, шрифты и архивы уже сжаты.
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.ico')
+# Сжатые копии в порядке предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+ACCEPT_ENCODING = re.compile(r'([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if not isinstance(processed, Exception):
+                names.update({name, hashed_name} - {None})
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        """Пишет рядом с файлом сжатые копии, если они меньше него."""
+        with self.open(name) as source:
+            data = source.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файла нет в манифесте: collectstatic не запускался
+            # (разработка, тесты) или файла нет вовсе. Страница всё равно
+            # строится, а файл отдаётся под исходным именем.
+            return name
+
+
+def accepted(request):
+    """Кодировки из ENCODINGS, которые принимает клиент. Явный отказ
+    coding;q=0 сильнее `*`."""
+    qualities = {}
+    for coding, quality in ACCEPT_ENCODING.findall(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    ):
+        try:
+            qualities[coding.lower()] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    anything = qualities.get('*', 0)
+    return {
+        coding for coding, _ in ENCODINGS
+        if qualities.get(coding, anything) > 0
+    }
+
+
+def locate(path):
+    """Путь к файлу статики и его stat или Http404."""
+    if settings.STATIC_ROOT and os.path.isdir(settings.STATIC_ROOT):
+        return resolve(settings.STATIC_ROOT, path)
+    # collectstatic не запускался: ищем в STATICFILES_DIRS и приложениях.
+    found = finders.find(path)
+    if not found:
+        raise Http404
+    root = found[:-len(path)] if found.endswith(path) else None
+    if root is None:
+        raise Http404
+    return resolve(root, path)
+
+
+def serve(request, path):
+    fullpath, info = locate(path)
+    content_type = encoding = None
+    codings = accepted(request)
+    for coding, suffix in ENCODINGS:
+        if coding in codings:
+            try:
+                fullpath, info = resolve(
+                    os.path.dirname(fullpath),
+                    os.path.basename(fullpath) + suffix
+                )
+            except Http404:
+                continue
+            content_type = (
+                mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            )
+            encoding = coding
+            break
+    hashed = path in getattr(staticfiles_storage, 'hashed_files', {}).values()
+    response = respond(
+        request, fullpath, info, IMMUTABLE if hashed else 'no-cache',
+        content_type=content_type, encoding=encoding
+    )
+    if path.endswith(COMPRESSIBLE):
+        response['Vary'] = 'Accept-Encoding'
+    return response
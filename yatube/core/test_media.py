@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, SimpleTestCase, override_settings
+from django.urls import reverse
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+IMAGE_URL = reverse('media', args=['posts/ab/image.gif'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'ab'))
+        for name in 'image.gif', '.upload-123':
+            with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'ab', name),
+                      'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.guest = Client()
+
+    def test_file_response(self):
+        """Без MEDIA_SENDFILE файл отдаёт Django с ETag и Accept-Ranges"""
+        response = self.guest.get(IMAGE_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertTrue(response['ETag'])
+
+    def test_not_modified(self):
+        """Совпавший ETag даёт 304 без тела"""
+        etag = self.guest.get(IMAGE_URL)['ETag']
+        response = self.guest.get(IMAGE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_ranges(self):
+        """Диапазоны байтов отдаются с кодом 206"""
+        size = len(CONTENT)
+        cases = (
+            ('bytes=10-19', 10, 19),
+            ('bytes=1000-', 1000, size - 1),
+            ('bytes=-5', size - 5, size - 1),
+            ('bytes=1020-5000', 1020, size - 1),
+        )
+        for header, start, end in cases:
+            with self.subTest(header=header):
+                response = self.guest.get(IMAGE_URL, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    CONTENT[start:end + 1]
+                )
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/{size}'
+                )
+                self.assertEqual(
+                    response['Content-Length'], str(end - start + 1)
+                )
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла даёт 416"""
+        response = self.guest.get(IMAGE_URL, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range(self):
+        """При устаревшем If-Range файл отдаётся целиком"""
+        response = self.guest.get(
+            IMAGE_URL, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """nginx получает внутренний адрес файла вместо тела"""
+        response = self.guest.get(IMAGE_URL)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_PREFIX + 'posts/ab/image.gif'
+        )
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        """Apache получает путь к файлу на диске"""
+        response = self.guest.get(IMAGE_URL)
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'ab', 'image.gif')
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_not_found(self):
+        """Скрытые, отсутствующие и внешние файлы не отдаются"""
+        for path in (
+            'posts/ab/.upload-123', 'posts/ab/missing.gif', 'posts/ab',
+            '../manage.py',
+        ):
+            with self.subTest(path=path):
+                response = self.guest.get(settings.MEDIA_URL + path)
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+INDEX_URL = reverse('posts:index')
+METRICS_URL = reverse('metrics')
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.guest = Client()
+
+    def test_server_timing_header(self):
+        """Ответ несёт Server-Timing с SQL, шаблонами и общим временем"""
+        header = self.guest.get(INDEX_URL)['Server-Timing']
+        for name in ('db;dur=', 'queries"', 'tpl;dur=', 'total;dur='):
+            with self.subTest(name=name):
+                self.assertIn(name, header)
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        """Server-Timing отключается настройкой"""
+        self.assertNotIn('Server-Timing', self.guest.get(INDEX_URL))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_histograms_by_view_name(self):
+        """Гистограммы собираются по имени view"""
+        self.guest.get(INDEX_URL)
+        self.guest.get(INDEX_URL)
+        text = self.guest.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        ).content.decode()
+        for name in ('request_seconds', 'db_queries', 'db_seconds',
+                     'template_seconds'):
+            with self.subTest(name=name):
+                self.assertIn(
+                    f'yatube_{name}_count{{view="posts:index"}} 2', text
+                )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 2', text
+        )
+
+    def test_query_count_recorded(self):
+        """Число SQL-запросов попадает в нужную корзину"""
+        self.guest.get(INDEX_URL)
+        series = metrics.DB_QUERIES.series['posts:index']
+        self.assertEqual(series[-1], 1)
+        self.assertGreater(series[-2], 0)
+        template = metrics.TEMPLATE_SECONDS.series['posts:index']
+        self.assertGreater(template[-2], 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_hidden_from_strangers(self):
+        """Метрики видны только staff и по токену, не по адресу"""
+        self.assertEqual(self.guest.get(METRICS_URL).status_code, 404)
+        self.assertEqual(self.guest.get(
+            METRICS_URL, REMOTE_ADDR='127.0.0.1',
+            HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 404)
+        self.assertEqual(self.guest.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        ).status_code, 200)
+        staff = User.objects.create_user(username='admin', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        self.assertEqual(client.get(METRICS_URL).status_code, 200)
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import db, routers
+from posts.models import FeedVersion, Post, User
+
+INDEX_URL = reverse('posts:index')
+POST_CREATE_URL = reverse('posts:post_create')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.user
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def read_aliases(self, method, url, data=None):
+        '''Куда роутер отправил чтения; сами запросы идут в default.'''
+        aliases = []
+        replica_alias = routers.replica_alias
+
+        def record():
+            aliases.append(replica_alias())
+
+        with mock.patch.object(routers, 'replica_alias', record):
+            getattr(self.client, method)(url, data)
+        return set(aliases)
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_feed_reads_go_to_replica(self):
+        """Чтения лент идут на реплику"""
+        self.assertEqual(self.read_aliases('get', INDEX_URL), {'replica'})
+
+    def test_recently_changed_feed_read_from_primary(self):
+        """Ленту, изменённую в пределах отставания реплики, другие
+        клиенты читают из основной БД, и в кеш не попадает старое"""
+        Post.objects.create(text='Новый пост', author=self.user)
+        self.client = Client()
+        self.assertEqual(self.read_aliases('get', INDEX_URL), {None})
+
+    def test_write_on_get_sticks_to_primary(self):
+        """Подписка через GET тоже отправляет чтения в основную БД"""
+        author = User.objects.create_user(username='Ivan')
+        follow_url = reverse('posts:profile_follow', args=['Ivan'])
+        profile_url = reverse('posts:profile', args=['Ivan'])
+        response = self.client.get(follow_url)
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertTrue(author.following.filter(user=self.user).exists())
+        self.assertEqual(self.read_aliases('get', profile_url), {None})
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_reads_without_writes_do_not_stick(self):
+        """Запрос без записи куку не ставит"""
+        with mock.patch.object(routers, 'replica_alias', lambda: None):
+            response = self.client.get(INDEX_URL)
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_other_views_read_primary(self):
+        """Прочие view читают из основной БД"""
+        self.assertEqual(self.read_aliases('get', POST_CREATE_URL), {None})
+
+    def test_reads_stick_to_primary_after_write(self):
+        """После записи клиент читает из основной БД"""
+        comment_url = reverse('posts:add_comment', args=[self.post.id])
+        self.read_aliases('post', comment_url, {'text': 'Комментарий'})
+        self.assertEqual(self.read_aliases('get', INDEX_URL), {None})
+
+    def test_reads_after_write_in_same_request(self):
+        """После записи в запросе чтения идут в основную БД"""
+        router = routers.ReplicaRouter()
+        routers.use_replica(True)
+        self.addCleanup(routers.use_replica, False)
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_feed_versions_read_from_primary(self):
+        """Версии лент читаются из основной БД,
+        а их запись не отменяет чтение с реплики"""
+        router = routers.ReplicaRouter()
+        routers.use_replica(True)
+        self.addCleanup(routers.use_replica, False)
+        self.assertEqual(router.db_for_read(FeedVersion), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_write(FeedVersion), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Post), 'replica')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё читается из основной БД"""
+        self.assertEqual(self.read_aliases('get', INDEX_URL), {None})
+
+
+class HealthCheckTests(SimpleTestCase):
+    def test_broken_connections_are_closed(self):
+        """Оборванное постоянное соединение закрывается"""
+        broken, alive, closed = mock.Mock(), mock.Mock(), mock.Mock()
+        broken.is_usable.return_value = False
+        alive.is_usable.return_value = True
+        closed.connection = None
+        with mock.patch.object(
+            db.connections, 'all', return_value=[broken, alive, closed]
+        ):
+            db.close_unusable_connections()
+        broken.close.assert_called_once()
+        alive.close.assert_not_called()
+        closed.is_usable.assert_not_called()
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.db import apply_pragmas, retry_on_locked
+
+ROLLBACK_JOURNAL = {'journal_mode': 'delete'}
+
+
+class SqliteFileTestCase(SimpleTestCase):
+    """Отдельный файл БД: WAL не работает в БД тестов в памяти."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(self.remove)
+        db = self.connect(settings.SQLITE_PRAGMAS)
+        db.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, text TEXT)')
+        db.close()
+
+    def remove(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def connect(self, pragmas, timeout=0):
+        db = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None,
+            check_same_thread=False
+        )
+        apply_pragmas(db.cursor(), pragmas)
+        return db
+
+
+class ReadersDoNotBlockWriterTests(SqliteFileTestCase):
+    def commit_under_open_read(self, pragmas):
+        reader, writer = self.connect(pragmas), self.connect(pragmas)
+        try:
+            reader.execute('BEGIN')
+            reader.execute('SELECT COUNT(*) FROM item').fetchone()
+            writer.execute('BEGIN')
+            writer.execute("INSERT INTO item (text) VALUES ('-')")
+            writer.execute('COMMIT')
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_rollback_journal_blocks_writer(self):
+        """Без WAL открытое чтение не даёт зафиксировать запись"""
+        with self.assertRaisesRegex(sqlite3.OperationalError, 'locked'):
+            self.commit_under_open_read(ROLLBACK_JOURNAL)
+
+    def test_wal_does_not_block_writer(self):
+        """С WAL запись фиксируется при открытом чтении"""
+        self.commit_under_open_read(settings.SQLITE_PRAGMAS)
+
+
+class ConcurrentStressTests(SqliteFileTestCase):
+    THREADS = 8
+    OPERATIONS = 100
+
+    def run_load(self, pragmas, timeout):
+        errors = []
+
+        def work(number):
+            db = self.connect(pragmas, timeout)
+            try:
+                for step in range(self.OPERATIONS):
+                    if (number + step) % 4:
+                        db.execute('SELECT COUNT(*) FROM item').fetchone()
+                    else:
+                        db.execute('BEGIN IMMEDIATE')
+                        db.execute("INSERT INTO item (text) VALUES ('-')")
+                        db.execute('COMMIT')
+            except sqlite3.OperationalError as error:
+                errors.append(error)
+            finally:
+                db.close()
+
+        threads = [
+            threading.Thread(target=work, args=[number])
+            for number in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_wal_with_busy_timeout_has_no_lock_errors(self):
+        """Смешанная нагрузка в WAL с таймаутом проходит без блокировок"""
+        errors = self.run_load(settings.SQLITE_PRAGMAS, timeout=20)
+        self.assertEqual(errors, [])
+        db = self.connect({})
+        self.assertEqual(
+            db.execute('SELECT COUNT(*) FROM item').fetchone()[0],
+            self.THREADS * self.OPERATIONS // 4
+        )
+        db.close()
+
+
+class PragmaTests(TestCase):
+    def test_connection_gets_pragmas(self):
+        """Подключение Django получает прагмы из настроек"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64 * 1024)
+
+
+@override_settings(DB_LOCK_RETRY_DELAY=0)
+class RetryOnLockedTests(SimpleTestCase):
+    def test_retries_locked_database(self):
+        """Запись повторяется, пока БД заблокирована"""
+        view = mock.Mock(side_effect=[
+            OperationalError('database is locked'),
+            OperationalError('database is locked'),
+            'ok',
+        ])
+        self.assertEqual(retry_on_locked(view)('request'), 'ok')
+        self.assertEqual(view.call_count, 3)
+
+    def test_gives_up_after_retries(self):
+        """После DB_LOCK_RETRIES повторов ошибка пробрасывается"""
+        view = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(view)('request')
+        self.assertEqual(view.call_count, settings.DB_LOCK_RETRIES + 1)
+
+    def test_other_errors_are_not_retried(self):
+        """Прочие ошибки БД не повторяются"""
+        view = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(view)('request')
+        self.assertEqual(view.call_count, 1)
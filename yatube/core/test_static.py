@@ -0,0 +1,123 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, override_settings
+
+from core import static
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE_DIR = os.path.join(TEMP_DIR, 'source')
+STATIC_ROOT = os.path.join(TEMP_DIR, 'collected')
+CSS = b'body { margin: 0; }\n' * 100
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+
+
+@override_settings(STATICFILES_DIRS=[SOURCE_DIR], STATIC_ROOT=STATIC_ROOT)
+class StaticTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name, content in ('css/site.css', CSS), ('img/logo.png', PNG):
+            path = os.path.join(SOURCE_DIR, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(content)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.css_url = staticfiles_storage.url('css/site.css')
+        cls.png_url = staticfiles_storage.url('img/logo.png')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.guest = Client()
+
+    def collected(self, name):
+        return os.path.exists(os.path.join(STATIC_ROOT, name))
+
+    def test_collectstatic(self):
+        """collectstatic пишет имена с хешем и сжатые копии текстовых
+        файлов"""
+        self.assertRegex(
+            self.css_url, r'^/static/css/site\.[0-9a-f]{12}\.css$'
+        )
+        hashed = self.css_url[len(settings.STATIC_URL):]
+        self.assertTrue(self.collected(hashed + '.gz'))
+        self.assertTrue(self.collected('css/site.css.gz'))
+        self.assertFalse(self.collected(
+            self.png_url[len(settings.STATIC_URL):] + '.gz'
+        ))
+
+    def test_precompressed(self):
+        """Сжатая копия выбирается по Accept-Encoding"""
+        response = self.guest.get(self.css_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), CSS
+        )
+        for accept in '', 'gzip;q=0, deflate', 'br;q=0, gzip;q=0, *':
+            with self.subTest(accept=accept):
+                response = self.guest.get(
+                    self.css_url, HTTP_ACCEPT_ENCODING=accept
+                )
+                self.assertNotIn('Content-Encoding', response)
+                self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_brotli_preferred(self):
+        """С brotli пишутся и выбираются копии .br, gzip;q=0 при `*`
+        соблюдается"""
+        if static.brotli is None:
+            self.skipTest('brotli не установлен')
+        hashed = self.css_url[len(settings.STATIC_URL):]
+        self.assertTrue(self.collected(hashed + '.br'))
+        for accept, encoding in (
+            ('gzip, br', 'br'), ('gzip;q=0, *', 'br'), ('br;q=0, *', 'gzip'),
+        ):
+            with self.subTest(accept=accept):
+                response = self.guest.get(
+                    self.css_url, HTTP_ACCEPT_ENCODING=accept
+                )
+                self.assertEqual(response['Content-Encoding'], encoding)
+
+    def test_cache_control(self):
+        """Файлы с хешем кешируются навсегда, остальные перепроверяются"""
+        cases = (
+            (self.css_url, 'public, max-age=31536000, immutable'),
+            (self.png_url, 'public, max-age=31536000, immutable'),
+            ('/static/css/site.css', 'no-cache'),
+        )
+        for url, cache_control in cases:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response['Cache-Control'], cache_control)
+                revalidated = self.guest.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(revalidated.status_code, 304)
+
+    def test_not_found(self):
+        """Отсутствующие файлы и пути вне STATIC_ROOT не отдаются"""
+        for path in 'css/missing.css', '../source/css/site.css':
+            with self.subTest(path=path):
+                response = self.guest.get(settings.STATIC_URL + path)
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(STATIC_ROOT=os.path.join(TEMP_DIR, 'missing'))
+    def test_without_collectstatic(self):
+        """До collectstatic файлы отдаются из STATICFILES_DIRS
+        под исходными именами"""
+        self.assertEqual(
+            staticfiles_storage.url('img/logo.png'), '/static/img/logo.png'
+        )
+        response = self.guest.get('/static/img/logo.png')
+        self.assertEqual(b''.join(response.streaming_content), PNG)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
@@ -0,0 +1,64 @@
+"""Помощники массовой записи для generatedata и importposts."""
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create записал свои даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Удаляет вторичные индексы моделей на время записи и создаёт заново.
+
+    Построить индекс один раз быстрее, чем обновлять его на каждой строке.
+    """
+    indexes = [(model, index) for model in models
+               for index in model._meta.indexes]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+
+
+class Lookup:
+    """Ключи объектов по значению поля с кешем в памяти.
+
+    Недостающие значения запрашиваются одним запросом на пачку, а с
+    create — создаются через bulk_create.
+    """
+
+    def __init__(self, model, field, create=None):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.keys = {}
+
+    def resolve(self, values):
+        missing = {value for value in values if value} - self.keys.keys()
+        if missing and self.create:
+            self.model.objects.bulk_create(
+                [self.create(value) for value in missing],
+                ignore_conflicts=True
+            )
+        if missing:
+            self.keys.update(self.model.objects.filter(**{
+                f'{self.field}__in': missing
+            }).values_list(self.field, 'pk'))
+
+    def get(self, value):
+        return self.keys.get(value)
@@ -0,0 +1,99 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from core import routers
+
+from .models import FeedVersion
+
+# Версия ленты — время её последнего изменения в наносекундах.
+# Версии хранятся в таблице FeedVersion, общей для всех процессов:
+# сами фрагменты и страницы могут лежать в кеше процесса, ведь ключ
+# старой версии после записи просто перестаёт запрашиваться. Чтение
+# строк не создаёт: у ленты, которая ещё не менялась, версия 0.
+# Версия, общая для всех лент: меняется при правке групп и авторов.
+ALL_FEEDS = 'feeds'
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def get_versions(*names, request=None):
+    """Текущие номера версий лент.
+
+    С request версии читаются из БД одним запросом за запрос.
+    """
+    known = getattr(request, '_feed_versions', {})
+    missing = [name for name in names if name not in known]
+    if missing:
+        versions = dict(FeedVersion.objects.filter(
+            name__in=missing
+        ).values_list('name', 'version'))
+        for name in missing:
+            known[name] = versions.get(name, 0)
+        if request is not None:
+            request._feed_versions = known
+    return [known[name] for name in names]
+
+
+def bump(*names):
+    """Сдвигает версии лент после записи.
+
+    Внутри транзакции версии сдвигаются ещё раз после её фиксации:
+    читатель, который между первым сдвигом и фиксацией положил в кеш
+    незафиксированно-старые данные под новой версией, их не найдёт.
+    """
+    shift(names)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: shift(names))
+
+
+def shift(names):
+    FeedVersion.objects.bulk_create(
+        [FeedVersion(name=name) for name in set(names)],
+        ignore_conflicts=True
+    )
+    # Даже если часы отстали, новая версия больше прежней.
+    FeedVersion.objects.filter(name__in=names).update(
+        version=Greatest(F('version') + 1, time.time_ns())
+    )
+
+
+def post_feeds(post):
+    """Ленты, в которых выводится пост."""
+    feeds = ['index', f'profile:{post.author_id}', f'post:{post.pk}']
+    if post.group_id:
+        feeds.append(f'group:{post.group_id}')
+    return feeds
+
+
+def read_primary_if_recent(versions):
+    """Ленты, изменённые за последние REPLICA_STICKY_SECONDS, читаются
+    из основной БД: реплика может ещё не знать о записи, а прочитанное
+    ляжет в кеш под новой версией."""
+    age = time.time_ns() - max(versions)
+    if age < settings.REPLICA_STICKY_SECONDS * 10 ** 9:
+        routers.use_replica(False)
+
+
+def feed_cache(request, *feeds):
+    """Контекст для {% cache %}: ключ из версий лент и курсора страницы."""
+    page = page_key(request)
+    read_primary_if_recent(
+        get_versions(ALL_FEEDS, *feeds, request=request)
+    )
+    return {
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_cache_key': ':'.join(
+            map(str, [
+                *feeds,
+                *get_versions(ALL_FEEDS, *feeds, request=request),
+                *page,
+            ])
+        ),
+    }
+
+
+def page_key(request):
+    return [request.GET.get(param, '') for param in PAGE_PARAMS]
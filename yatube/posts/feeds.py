@@ -0,0 +1,47 @@
+from .models import Comment, Post
+
+# Поля, которые выводит posts/includes/post.html.
+POST_FIELDS = (
+    'id', 'text_html', 'excerpt', 'pub_date', 'image', 'image_variants'
+)
+AUTHOR_FIELDS = (
+    'author', 'author__username', 'author__first_name', 'author__last_name'
+)
+GROUP_FIELDS = ('group', 'group__slug', 'group__title')
+# Поля, которые выводит posts/includes/comment_list.html.
+COMMENT_FIELDS = (
+    'id', 'text', 'text_html', 'created', 'author', 'author__username'
+)
+
+
+def feed(queryset, *relations):
+    """Лента с авторами и группами в одном запросе."""
+    fields = [*POST_FIELDS, *AUTHOR_FIELDS]
+    if 'group' in relations:
+        fields.extend(GROUP_FIELDS)
+    else:
+        fields.append('group_id')
+    return queryset.select_related('author', *relations).only(*fields)
+
+
+def index_feed():
+    return feed(Post.objects.all(), 'group')
+
+
+def group_feed(group):
+    # Группа на своей странице не выводится: достаточно group_id.
+    return feed(group.posts.all())
+
+
+def profile_feed(author):
+    return feed(author.posts.all(), 'group')
+
+
+def post_detail_queryset():
+    return feed(Post.objects.all(), 'group')
+
+
+def comments_feed(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(*COMMENT_FIELDS)
@@ -1,5 +1,6 @@
 from django import forms
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -8,6 +9,20 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        upload = self.files.get('image')
+        self.upload_error = upload and uploads.check(upload)
+        if self.upload_error:
+            # Отвергнутый файл ImageField не открывает вовсе.
+            self.files = self.files.copy()
+            self.files.pop('image')
+
+    def clean_image(self):
+        if self.upload_error:
+            raise forms.ValidationError(self.upload_error)
+        return self.cleaned_data['image']
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,146 @@
+import json
+import random
+import subprocess
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Group, Post, User
+
+VIEWS = ('index', 'group_list', 'profile', 'post_detail', 'follow_index')
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    values = sorted(values)
+    index = max(round(share * len(values) + 0.5) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summary(latencies, queries):
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'queries_p50': percentile(queries, 0.50),
+        'queries_max': max(queries),
+    }
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет ленты через тестовый клиент и выводит перцентили '
+        'времени ответа и число SQL-запросов в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов на каждую view.'
+        )
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=list(VIEWS)
+        )
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Из скольких первых страниц лент выбирать.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Файл для JSON вместо стандартного вывода.'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.pages = options['pages']
+        self.client = Client()
+        reader = User.objects.annotate(
+            following_total=Count('follower')
+        ).order_by('-following_total').first()
+        if reader is None or not Post.objects.exists():
+            raise CommandError('Нет данных: запустите generatedata.')
+        self.client.force_login(reader)
+        self.groups = list(Group.objects.values_list('slug', flat=True)[:100])
+        self.authors = list(User.objects.filter(
+            stats__posts_count__gt=0
+        ).order_by('-stats__posts_count').values_list(
+            'username', flat=True
+        )[:100])
+        self.posts = list(Post.objects.values_list('pk', flat=True)[:1000])
+        results = {}
+        for view in options['views']:
+            for _ in range(options['warmup']):
+                self.client.get(self.url(view))
+            latencies, queries = [], []
+            for _ in range(options['requests']):
+                url = self.url(view)
+                if options['cold']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = self.client.get(url)
+                    latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f'{url}: {response.status_code}')
+                queries.append(len(captured))
+            results[view] = summary(latencies, queries)
+        report = json.dumps({
+            'revision': revision(),
+            'created': timezone.now().isoformat(),
+            'cold': options['cold'],
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'views': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+    def url(self, view):
+        page = self.random.randint(1, self.pages)
+        if view == 'group_list' and self.groups:
+            path = reverse('posts:group_list', args=[
+                self.random.choice(self.groups)
+            ])
+        elif view == 'profile' and self.authors:
+            path = reverse('posts:profile', args=[
+                self.random.choice(self.authors)
+            ])
+        elif view == 'post_detail':
+            return reverse('posts:post_detail', args=[
+                self.random.choice(self.posts)
+            ])
+        elif view == 'follow_index':
+            path = reverse('posts:follow_index')
+        else:
+            path = reverse('posts:index')
+        return f'{path}?page={page}'
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в NDJSON или CSV '
+        'потоком, не загружая их в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=export.KINDS)
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='ndjson'
+        )
+        parser.add_argument(
+            '--since', type=export.parse_moment,
+            help='Не раньше этой даты (ISO 8601).'
+        )
+        parser.add_argument(
+            '--until', type=export.parse_moment,
+            help='Раньше этой даты (ISO 8601).'
+        )
+        parser.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки вместо стандартного вывода.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = export.records(
+                options['kind'], options['since'], options['until'],
+                options['group']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        chunks = export.stream(
+            options['kind'], rows, options['format'], options['gzip']
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            # Выгрузка в байтах, а self.stdout пишет текст.
+            output = getattr(self.stdout._out, 'buffer', self.stdout._out)
+            output.writelines(chunks)
+            output.flush()
@@ -0,0 +1,175 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from posts.bulk import explicit_dates
+from posts.models import Comment, Follow, Group, Post, User
+from posts.rebuild import rebuild_derived
+from posts.rendering import render
+
+WORDS = (
+    'кошка собака погода город лето зима море дорога книга музыка '
+    'работа утро вечер друг дом сад река лес снег дождь солнце поезд '
+    'кофе чай школа фильм игра новости спорт проект код python django'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетические данные: пользователей, группы, посты, '
+        'комментарии и подписки со степенным распределением.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель степенного закона для авторов, подписок '
+                 'и групп: чем больше, тем сильнее перекос.'
+        )
+        parser.add_argument(
+            '--ungrouped', type=float, default=0.3,
+            help='Доля постов без группы.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты постов.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя.')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+        prefix = f'gen{self.now:%Y%m%d%H%M%S}'
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'])
+            groups = self.create_groups(prefix, options['groups'])
+            posts = self.create_posts(
+                users, groups, options['posts'], options['ungrouped']
+            )
+            self.create_comments(users, posts, options['comments'])
+            self.create_follows(users, options['follows'])
+            rebuild_derived(stdout=self.stdout)
+        self.stdout.write(
+            f'Пользователей: {len(users)}, групп: {len(groups)}, '
+            f'постов: {len(posts)}'
+        )
+
+    def weighted(self, population):
+        """Выбор из population с весом 1 / rank ** skew."""
+        weights = list(accumulate(
+            1 / rank ** self.skew for rank in range(1, len(population) + 1)
+        ))
+        return lambda: self.random.choices(population, cum_weights=weights)[0]
+
+    def moment(self):
+        return self.now - timedelta(seconds=self.random.random() * self.span)
+
+    def text(self, low, high):
+        return ' '.join(
+            self.random.choice(WORDS)
+            for _ in range(self.random.randint(low, high))
+        ).capitalize()
+
+    def insert(self, model, objects, total):
+        """Пишет объекты пачками по batch_size, не держа их в памяти."""
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                batch.clear()
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def create_users(self, prefix, count):
+        password = make_password(None)
+        self.insert(User, (
+            User(username=f'{prefix}_{number}', password=password)
+            for number in range(count)
+        ), count)
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).values_list('pk', flat=True))
+
+    def create_groups(self, prefix, count):
+        self.insert(Group, (
+            Group(
+                title=f'Группа {number}',
+                slug=f'{prefix}-{number}',
+                description=self.text(5, 20),
+            )
+            for number in range(count)
+        ), count)
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-'
+        ).values_list('pk', flat=True))
+
+    def create_posts(self, users, groups, count, ungrouped):
+        author = self.weighted(users)
+        group = self.weighted(groups) if groups else lambda: None
+        last = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            self.insert(Post, (
+                render(Post(
+                    text=self.text(5, 60),
+                    author_id=author(),
+                    group_id=(
+                        None if self.random.random() < ungrouped
+                        else group()
+                    ),
+                    pub_date=self.moment(),
+                ))
+                for _ in range(count)
+            ), count)
+        return list(
+            Post.objects.filter(pk__gt=last).values_list('pk', flat=True)
+        )
+
+    def create_comments(self, users, posts, count):
+        if not posts:
+            return
+        # Обсуждают в основном популярные посты.
+        post = self.weighted(posts)
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.insert(Comment, (
+                render(Comment(
+                    post_id=post(),
+                    author_id=self.random.choice(users),
+                    text=self.text(3, 30),
+                    created=self.moment(),
+                ))
+                for _ in range(count)
+            ), count)
+
+    def create_follows(self, users, count):
+        author = self.weighted(users)
+        edges = set()
+        # Повторы отбрасываются; попыток ограниченное число.
+        for _ in range(count * 3):
+            if len(edges) >= count:
+                break
+            user, followed = self.random.choice(users), author()
+            if user != followed:
+                edges.add((user, followed))
+        self.insert(Follow, (
+            Follow(user_id=user, author_id=followed)
+            for user, followed in edges
+        ), len(edges))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Ставит в очередь создание вариантов картинок постов, у которых '
+        'их ещё нет: например, после importposts или переноса файлов.'
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            image_variants=''
+        ).only('pk', 'image', 'image_variants', 'author_id', 'group_id')
+        total = 0
+        for post in posts.iterator():
+            thumbnails.schedule(post)
+            total += 1
+        self.stdout.write(f'Картинок без вариантов: {total}')
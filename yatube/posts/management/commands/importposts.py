@@ -0,0 +1,217 @@
+import csv
+import gzip
+import json
+import sys
+import time
+from contextlib import ExitStack
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from posts.bulk import Lookup, deferred_indexes, explicit_dates
+from posts.rendering import render
+from posts.export import parse_moment
+from posts.models import Comment, Group, Post, User
+from posts.rebuild import rebuild_derived
+
+KINDS = {'posts': (Post, 'pub_date'), 'comments': (Comment, 'created')}
+
+
+def reset_sequences(model):
+    """Сдвигает счётчик id за загруженные явные id (PostgreSQL);
+    в SQLite запросов нет."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты или комментарии из NDJSON или CSV в формате '
+        'exportposts пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument(
+            'path', help='Файл, .gz читается со сжатием; - — stdin.'
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='По умолчанию — по расширению файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы, '
+                 'а не пропускать их строки.'
+        )
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help='Удалить вторичные индексы на время загрузки.'
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поиск: например, '
+                 'если следом грузится ещё один файл.'
+        )
+
+    def handle(self, *args, **options):
+        model, date_field = KINDS[options['kind']]
+        build = getattr(self, f'build_{options["kind"]}')
+        self.now = timezone.now()
+        password = make_password(None)
+        create = options['create_missing']
+        self.authors = Lookup(User, 'username', create=(
+            lambda username: User(username=username, password=password)
+        ) if create else None)
+        self.groups = Lookup(Group, 'slug', create=(
+            lambda slug: Group(title=slug, slug=slug, description='')
+        ) if create else None)
+        started = time.monotonic()
+        failure = None
+        try:
+            self.load(model, date_field, build, options, started)
+        except (ValueError, IntegrityError) as error:
+            # Уже загруженные пачки остаются: ниже для них пересчитываются
+            # производные данные.
+            failure = CommandError(
+                f'Строка {self.imported + self.skipped + 1} и дальше: '
+                f'{error}. До ошибки загружено: {self.imported}'
+            )
+        if self.imported:
+            reset_sequences(model)
+        if not options['no_rebuild']:
+            # Ленты подписок меняются только у авторов новых постов.
+            rebuild_derived(stdout=self.stdout, authors=self.post_authors)
+        self.report(model, self.imported, started)
+        missing = self.skipped - self.committed_conflicts
+        if missing:
+            self.stdout.write(
+                f'Пропущено строк без автора, группы или поста: {missing}'
+            )
+        if self.committed_conflicts:
+            self.stdout.write(
+                'Пропущено строк с уже занятым id: '
+                f'{self.committed_conflicts}'
+            )
+        if failure is not None:
+            raise failure
+
+    def load(self, model, date_field, build, options, started):
+        """Загружает файл пачками, каждую в своей транзакции."""
+        self.imported = self.skipped = 0
+        self.conflicts = self.committed_conflicts = 0
+        self.post_authors = set()
+        with ExitStack() as stack:
+            rows = self.rows(stack, options['path'], options['format'])
+            stack.enter_context(explicit_dates(
+                model._meta.get_field(date_field)
+            ))
+            if options['defer_indexes']:
+                stack.enter_context(deferred_indexes(model))
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    objects = list(build(batch))
+                    model.objects.bulk_create(objects)
+                self.imported += len(objects)
+                self.skipped += len(batch) - len(objects)
+                self.committed_conflicts = self.conflicts
+                self.report(model, self.imported, started)
+
+    def report(self, model, imported, started):
+        seconds = time.monotonic() - started
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {imported} за '
+            f'{seconds:.1f} с, {imported / max(seconds, 1e-6):.0f} в секунду'
+        )
+
+    def rows(self, stack, path, format):
+        if path == '-':
+            source = sys.stdin
+        elif path.endswith('.gz'):
+            source = stack.enter_context(
+                gzip.open(path, 'rt', encoding='utf-8', newline='')
+            )
+        else:
+            source = stack.enter_context(
+                open(path, encoding='utf-8', newline='')
+            )
+        if (format or ('csv' if '.csv' in path else 'ndjson')) == 'csv':
+            return iter(csv.DictReader(source))
+        return (json.loads(line) for line in source if line.strip())
+
+    def moment(self, value):
+        return parse_moment(value) if value else self.now
+
+    def free_ids(self, model, batch):
+        """id строк пачки, ещё не занятые в БД."""
+        ids = [int(row['id']) for row in batch if row.get('id')]
+        return set(ids) - set(model.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True
+        ))
+
+    def take_id(self, row, free):
+        """id строки, None для строки без id и False для занятого:
+        такая строка пропускается, и повторная загрузка того же файла
+        не падает на IntegrityError."""
+        if not row.get('id'):
+            return None
+        pk = int(row['id'])
+        if pk not in free:
+            self.conflicts += 1
+            return False
+        free.discard(pk)
+        return pk
+
+    def build_posts(self, batch):
+        self.authors.resolve(row.get('author_username') for row in batch)
+        self.groups.resolve(row.get('group_slug') for row in batch)
+        free = self.free_ids(Post, batch)
+        for row in batch:
+            author = self.authors.get(row.get('author_username'))
+            slug = row.get('group_slug')
+            group = self.groups.get(slug) if slug else None
+            if author is None or slug and group is None:
+                continue
+            pk = self.take_id(row, free)
+            if pk is False:
+                continue
+            self.post_authors.add(author)
+            yield render(Post(
+                id=pk,
+                text=row.get('text') or '',
+                author_id=author,
+                group_id=group,
+                pub_date=self.moment(row.get('pub_date')),
+                image=row.get('image') or '',
+            ))
+
+    def build_comments(self, batch):
+        self.authors.resolve(row.get('author_username') for row in batch)
+        posts = set(Post.objects.filter(pk__in=[
+            int(row['post_id']) for row in batch if row.get('post_id')
+        ]).values_list('pk', flat=True))
+        free = self.free_ids(Comment, batch)
+        for row in batch:
+            author = self.authors.get(row.get('author_username'))
+            post = int(row['post_id']) if row.get('post_id') else None
+            if author is None or post not in posts:
+                continue
+            pk = self.take_id(row, free)
+            if pk is False:
+                continue
+            yield render(Comment(
+                id=pk,
+                post_id=post,
+                author_id=author,
+                text=row.get('text') or '',
+                created=self.moment(row.get('created')),
+            ))
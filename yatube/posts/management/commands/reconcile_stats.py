@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User, UserStats
+from posts.stats import COUNTERS, counted
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики профилей с постами и подписками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей UserStats обновлять за один запрос.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        users = counted(User.objects.select_related('stats')).order_by('pk')
+        missing, drifted = [], []
+        self.created = self.fixed = 0
+        for user in users.iterator(chunk_size=batch_size):
+            actual = {
+                name: getattr(user, f'actual_{name}') for name in COUNTERS
+            }
+            try:
+                stats = user.stats
+            except UserStats.DoesNotExist:
+                missing.append(UserStats(user=user, **actual))
+            else:
+                if any(getattr(stats, n) != v for n, v in actual.items()):
+                    for name, value in actual.items():
+                        setattr(stats, name, value)
+                    drifted.append(stats)
+            if len(missing) + len(drifted) >= batch_size:
+                self.flush(missing, drifted)
+        self.flush(missing, drifted)
+        self.stdout.write(f'Создано: {self.created}, исправлено: {self.fixed}')
+
+    def flush(self, missing, drifted):
+        UserStats.objects.bulk_create(missing)
+        UserStats.objects.bulk_update(drifted, list(COUNTERS))
+        self.created += len(missing)
+        self.fixed += len(drifted)
+        missing.clear()
+        drifted.clear()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import rendering
+from posts.feed_cache import ALL_FEEDS, bump
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново считает HTML и выдержки текста постов и комментариев, '
+        'например после смены правил вывода.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            total = rendering.backfill(model, options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+        bump(ALL_FEEDS)
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    def totals(queryset, field):
+        return dict(
+            queryset.order_by().values_list(field).annotate(
+                total=models.Count('pk')
+            )
+        )
+
+    posts = totals(Post.objects, 'author')
+    following = totals(Follow.objects, 'user')
+    followers = totals(Follow.objects, 'author')
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=pk,
+            posts_count=posts.get(pk, 0),
+            following_count=following.get(pk, 0),
+            followers_count=followers.get(pk, 0),
+        )
+        for pk in User.objects.values_list('pk', flat=True).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0015_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Счётчики профиля',
+                'verbose_name_plural': 'Счётчики профилей',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:19
+
+from django.db import migrations, models
+
+from posts.rendering import backfill
+
+
+def render_text(apps, schema_editor):
+    backfill(apps.get_model('posts', 'Post'))
+    backfill(apps.get_model('posts', 'Comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=200, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=200, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(render_text, migrations.RunPython.noop),
+    ]
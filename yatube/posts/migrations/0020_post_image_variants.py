@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_rendered_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(default='', editable=False, verbose_name='Варианты картинки'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_feed_versions_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedVersion',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Лента')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия ленты',
+                'verbose_name_plural': 'Версии лент',
+            },
+        ),
+        # Прежний DatabaseCache версий лент из миграции 0022.
+        migrations.RunSQL(
+            'DROP TABLE IF EXISTS feed_versions', migrations.RunSQL.noop
+        ),
+    ]
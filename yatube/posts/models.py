@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -22,6 +24,11 @@ class Group(models.Model):
 
 class Post(models.Model):
     text = models.TextField('Текст')
+    # Заполняются по text при сохранении, см. posts/rendering.py.
+    text_html = models.TextField('Текст в HTML', editable=False, default='')
+    excerpt = models.CharField(
+        'Начало текста', max_length=200, editable=False, default=''
+    )
     pub_date = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True,
@@ -44,11 +51,30 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=post_images,
+        blank=True,
+        # Счёт ссылок на файл, см. posts/storage.py.
+        db_index=True
+    )
+    # Варианты картинки в JSON, см. posts/thumbnails.py.
+    image_variants = models.TextField(
+        'Варианты картинки', editable=False, default=''
     )
 
     class Meta:
         ordering = ('-pub_date',)
+        # Обратный проход по (..., pub_date, id) отдаёт ленту по убыванию
+        # даты и id без сортировки.
+        indexes = [
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
         verbose_name_plural = 'Посты'
         verbose_name = 'Посты'
 
@@ -71,10 +97,20 @@ class Comment(models.Model):
         'Текст',
         help_text='Напишите комментарий'
     )
+    text_html = models.TextField('Текст в HTML', editable=False, default='')
+    excerpt = models.CharField(
+        'Начало текста', max_length=200, editable=False, default=''
+    )
     created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
 
@@ -107,8 +143,95 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
         verbose_name_plural = 'Подписки'
         verbose_name = 'Подписка'
 
     def __str__(self):
         return f'Пользователь: {self.user} - Автор: {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя (fan-out при публикации)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            )
+        ]
+        verbose_name_plural = 'Ленты подписок'
+        verbose_name = 'Запись ленты подписок'
+
+    def __str__(self):
+        return f'{self.user}: {self.post}'
+
+
+class UserStats(models.Model):
+    """Счётчики профиля, которые ведут записи постов и подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Счётчики профилей'
+        verbose_name = 'Счётчики профиля'
+
+    def __str__(self):
+        return f'Счётчики: {self.user}'
+
+
+class FeedVersion(models.Model):
+    """Версия ленты для ключей кеша страниц, см. posts/feed_cache.py."""
+    name = models.CharField('Лента', max_length=100, primary_key=True)
+    version = models.BigIntegerField('Версия', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Версии лент'
+        verbose_name = 'Версия ленты'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
@@ -0,0 +1,152 @@
+"""HTTP-кеширование страниц лент: условный GET и кеш страниц целиком.
+
+Страница ленты одинакова для всех, кроме шапки, кнопки подписки,
+формы комментария и кнопки правки. Они выводятся тегом {% personal %}
+и в сохранённой странице заменяются метками. При попадании в кеш
+view не вызывается: выводятся только шаблоны меток с контекстом
+запроса. Анонимам страница отдаётся целиком, уже со вставками.
+"""
+import base64
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .feed_cache import (
+    ALL_FEEDS, get_versions, page_key, read_primary_if_recent
+)
+
+HOLE = re.compile(r'<!--personal:([\w=-]+)-->(.*?)<!--/personal-->', re.S)
+PLACEHOLDER = re.compile(r'<!--personal:([\w=-]+)-->')
+
+
+def viewer_feeds(request):
+    # Подписки зрителя меняют кнопку подписки в профиле.
+    if request.user.is_authenticated:
+        return [f'follow:{request.user.pk}']
+    return []
+
+
+def feed_etag(request, *feeds):
+    """ETag страницы: версии лент, страница и зритель."""
+    feeds = [*feeds, *viewer_feeds(request)]
+    raw = ':'.join(map(str, [
+        *feeds, *get_versions(ALL_FEEDS, *feeds, request=request),
+        *page_key(request),
+        request.user.pk or '',
+    ]))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_last_modified(request, *feeds):
+    """Время последнего изменения лент."""
+    versions = get_versions(
+        ALL_FEEDS, *feeds, *viewer_feeds(request), request=request
+    )
+    return datetime.fromtimestamp(max(versions) / 10 ** 9, timezone.utc)
+
+
+def hole(template_name, args, content):
+    """Личный фрагмент страницы с меткой для кеша."""
+    payload = base64.urlsafe_b64encode(
+        json.dumps([template_name, args]).encode()
+    ).decode()
+    return f'<!--personal:{payload}-->{content}<!--/personal-->'
+
+
+def render_hole(request, payload):
+    template_name, args = json.loads(base64.urlsafe_b64decode(payload))
+    return render_to_string(template_name, args, request=request)
+
+
+def cache_key(request, feeds):
+    # Из строки запроса — только параметры страницы: прочие (метки
+    # рекламы и т. п.) страницу не меняют и не должны вытеснять из кеша
+    # настоящие страницы.
+    raw = ':'.join(map(str, [
+        request.path, *page_key(request), *feeds,
+        *get_versions(ALL_FEEDS, *feeds, request=request),
+    ]))
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def respond(request, feeds, view, *args, **kwargs):
+    """Ответ из кеша страниц или от view с сохранением в кеш."""
+    key = cache_key(request, feeds)
+    anonymous = not request.user.is_authenticated
+    if anonymous:
+        content = cache.get(key + ':anonymous')
+        if content is not None:
+            return HttpResponse(content)
+    body = cache.get(key)
+    if body is None:
+        read_primary_if_recent(
+            get_versions(ALL_FEEDS, *feeds, request=request)
+        )
+        # Тег {% personal %} оставит метки для кеша.
+        request.page_cache = True
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200 or response.streaming:
+            return response
+        content = response.content.decode()
+        cache.set(
+            key, HOLE.sub(r'<!--personal:\1-->', content),
+            settings.FEED_CACHE_TIMEOUT
+        )
+        response.content = HOLE.sub(r'\2', content)
+    else:
+        response = HttpResponse(PLACEHOLDER.sub(
+            lambda match: render_hole(request, match[1]), body
+        ))
+    if anonymous:
+        cache.set(
+            key + ':anonymous', response.content, settings.FEED_CACHE_TIMEOUT
+        )
+    return response
+
+
+def conditional_feed(feeds_of):
+    """Условный GET и кеш страниц для view ленты.
+
+    feeds_of(request, *args, **kwargs) возвращает имена лент, из которых
+    собрана страница, или None, если страницы нет. Ответ 304 уходит
+    до вывода шаблонов. Анонимный ответ может хранить прокси
+    FEED_PUBLIC_MAX_AGE секунд, ответ пользователю — только браузер,
+    с проверкой при каждом запросе.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            feeds = feeds_of(request, *args, **kwargs)
+            if feeds is None:
+                return view(request, *args, **kwargs)
+
+            @condition(
+                etag_func=lambda *_, **__: feed_etag(request, *feeds),
+                last_modified_func=lambda *_, **__: feed_last_modified(
+                    request, *feeds
+                ),
+            )
+            def cached_view(request, *args, **kwargs):
+                return respond(request, feeds, view, *args, **kwargs)
+
+            response = cached_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True, max_age=0,
+                    s_maxage=settings.FEED_PUBLIC_MAX_AGE
+                )
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,234 @@
+import base64
+import binascii
+import hashlib
+from functools import partial
+from math import ceil, isfinite
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(number, moment, pk):
+    """Непрозрачный курсор: номер страницы и ключ (дата или число, id)."""
+    if isinstance(moment, float):
+        moment = repr(moment)
+    else:
+        moment = moment.isoformat()
+    raw = f'{number}|{moment}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def parse_rank(key):
+    """Числовой ключ курсора (ранг поиска) или None."""
+    try:
+        rank = float(key)
+    except ValueError:
+        return None
+    return rank if isfinite(rank) else None
+
+
+def decode_cursor(token, parse_key=parse_datetime):
+    """Разбирает курсор, ключ — функцией parse_key; для битого курсора
+    или курсора с ключом другого типа возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        number, key, pk = raw.decode().split('|')
+        moment = parse_key(key)
+        number, pk = int(number), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return number, moment, pk
+
+
+def after_cursor(queryset, keys, descending, cursor=None):
+    """Строки после курсора (дата, id) в порядке обхода."""
+    if cursor is None:
+        return queryset
+    date_key, id_key = keys
+    moment, pk = cursor
+    lookup = 'lt' if descending else 'gt'
+    # Отдельная граница по дате, без OR: с неё индекс даты начинает
+    # обход прямо от курсора, а не с начала ленты.
+    return queryset.filter(
+        Q(**{f'{date_key}__{lookup}e': moment}),
+        Q(**{f'{date_key}__{lookup}': moment})
+        | Q(**{f'{id_key}__{lookup}': pk})
+    )
+
+
+def ordered(queryset, keys, descending, cursor=None):
+    """Запрос строк после курсора, упорядоченный по ключу (дата, id)."""
+    date_key, id_key = keys
+    prefix = '-' if descending else ''
+    return after_cursor(
+        queryset, keys, descending, cursor
+    ).order_by(prefix + date_key, prefix + id_key)
+
+
+def fetch(queryset, keys, limit, descending, cursor=None, offset=0):
+    """`limit` строк после курсора (дата, id) или со смещением."""
+    queryset = ordered(queryset, keys, descending, cursor)
+    return list(queryset[offset:offset + limit])
+
+
+def cached_count(queryset):
+    """COUNT(*) запроса, кешируемый на PAGINATOR_COUNT_TIMEOUT."""
+    key = 'paginator_count:' + hashlib.md5(
+        str(queryset.query).encode()
+    ).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+    return count
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу сортировки (дата, id) без COUNT(*) и OFFSET.
+
+    Страница выбирается условием на ключ и LIMIT по индексу даты,
+    поэтому любая страница стоит столько же, сколько первая.
+    Общее число записей берётся из кеша и только для окна номеров
+    и страниц по номеру: `num_pages` знает лишь текущую страницу
+    и, если она есть, следующую.
+    Ссылки на соседние страницы лежат в `page.next_cursor`
+    и `page.previous_cursor`, окно номеров страниц —
+    в `page.elided_page_range`.
+    """
+    ELLIPSIS = '…'
+    # Разбор ключа из курсора: дата для лент, ранг для поиска.
+    parse_key = staticmethod(parse_datetime)
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk'),
+                 count=None):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self._num_pages = 1
+        # Число записей, если оно уже известно без COUNT(*).
+        self._count = count
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    @property
+    def count(self):
+        if self._count is not None:
+            return self._count
+        return cached_count(self.object_list)
+
+    @property
+    def total_pages(self):
+        return max(ceil(self.count / self.per_page), 1)
+
+    def get_elided_page_range(self, number, on_each_side=2, on_ends=1):
+        """Номера страниц: первые и последние `on_ends`
+        и по `on_each_side` вокруг текущей, пропуски — ELLIPSIS.
+
+        Длина окна не зависит от числа записей в ленте.
+        """
+        total = max(self.total_pages, number)
+        if total <= (on_each_side + on_ends) * 2:
+            yield from range(1, total + 1)
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < total - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(total - on_ends + 1, total + 1)
+        else:
+            yield from range(number + 1, total + 1)
+
+    def get_page(self, number=None, after=None, before=None):
+        """Страница после курсора `after`, до курсора `before`
+        или по номеру `number`; при ошибке — первая страница."""
+        cursor = decode_cursor(after or before or '', self.parse_key)
+        if cursor is not None:
+            page = self._seek(cursor, older=bool(after))
+            if page is not None:
+                return page
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self.page(number)
+
+    def page(self, number):
+        """Страница по номеру: OFFSET от ближнего конца ленты.
+
+        Страницы из второй половины читаются от старых записей
+        по возрастанию ключа, и последняя стоит столько же, сколько
+        первая. Число записей для этого берётся из cached_count,
+        его всё равно просит окно номеров страниц.
+        """
+        offset = (number - 1) * self.per_page
+        if number > 1:
+            count = self.count
+            # Записи страницы с конца: [count - number * per_page,
+            # count - offset) в порядке возрастания.
+            end = count - offset
+            if 0 < end < offset:
+                return self._page_from_end(number, end)
+        rows = self._rows(descending=True, offset=offset)
+        if not rows and number > 1:
+            return self.page(1)
+        return self._build_page(
+            rows[:self.per_page], number, len(rows) > self.per_page
+        )
+
+    def _page_from_end(self, number, end):
+        start = max(end - self.per_page, 0)
+        rows = self._rows(descending=False, offset=start)[:end - start]
+        if not rows:
+            return self.page(1)
+        # Число записей из кеша могло устареть: следующая страница есть,
+        # пока перед этой остаются записи.
+        return self._build_page(rows[::-1], number, start > 0)
+
+    def _rows(self, descending, cursor=None, offset=0):
+        """До per_page + 1 строк: лишняя говорит о следующей странице."""
+        return fetch(
+            self.object_list, self.keys, self.per_page + 1,
+            descending, cursor, offset
+        )
+
+    def _seek(self, cursor, older):
+        number, moment, pk = cursor
+        rows = self._rows(descending=older, cursor=(moment, pk))
+        if not rows:
+            return None
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if older:
+            return self._build_page(rows, max(number, 2), has_more)
+        # Более новые записи выбраны по возрастанию ключа.
+        number = max(number, 2) if has_more else 1
+        return self._build_page(rows[::-1], number, True)
+
+    def _build_page(self, rows, number, has_next):
+        self._num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = page.previous_cursor = None
+        # Шаблон вызывает его без аргументов; COUNT(*) — только при выводе.
+        page.elided_page_range = partial(self.get_elided_page_range, number)
+        if rows and has_next:
+            page.next_cursor = self._cursor(rows[-1], number + 1)
+        if rows and number > 1:
+            page.previous_cursor = self._cursor(rows[0], number - 1)
+        return page
+
+    def _cursor(self, row, number):
+        date_key, id_key = self.keys
+        return encode_cursor(
+            number, getattr(row, date_key), getattr(row, id_key)
+        )
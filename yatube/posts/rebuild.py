@@ -0,0 +1,21 @@
+"""Пересчёт производных данных после массовой записи в обход сигналов.
+
+bulk_create и update не вызывают сигналы, поэтому счётчики профилей,
+ленты подписок, поисковый индекс и версии кеша лент после них
+приходится собирать заново.
+"""
+from django.core.management import call_command
+
+from . import search, timeline
+from .feed_cache import ALL_FEEDS, bump
+
+
+def rebuild_derived(stdout=None, authors=None):
+    """authors — id авторов, чьи посты записаны; None — все ленты
+    подписок пересобираются целиком."""
+    # Ленты зависят от счётчиков подписчиков, поэтому сначала счётчики.
+    call_command('reconcile_stats', stdout=stdout)
+    if authors is None or authors:
+        timeline.rebuild(authors)
+    search.rebuild()
+    bump(ALL_FEEDS)
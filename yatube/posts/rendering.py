@@ -0,0 +1,38 @@
+"""Готовый HTML текста постов и комментариев.
+
+Фильтр linebreaks на каждый пост ленты при каждом выводе дорог, поэтому
+HTML и короткая выдержка без разметки считаются при сохранении и лежат
+в полях text_html и excerpt. Сигнал pre_save заполняет их при save();
+bulk_create сигналы обходит, там render вызывается явно.
+"""
+from django.conf import settings
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+def render(obj):
+    """Заполняет text_html и excerpt объекта по его text."""
+    obj.text_html = linebreaks(obj.text, autoescape=True)
+    obj.excerpt = Truncator(' '.join(obj.text.split())).chars(
+        settings.TEXT_EXCERPT_LENGTH
+    )
+    return obj
+
+
+def backfill(model, batch_size=1000):
+    """Пересчитывает поля всех объектов model пачками по batch_size.
+
+    Возвращает число объектов.
+    """
+    last = total = 0
+    while True:
+        batch = list(model.objects.filter(pk__gt=last).order_by(
+            'pk'
+        ).only('pk', 'text')[:batch_size])
+        if not batch:
+            return total
+        model.objects.bulk_update(
+            [render(obj) for obj in batch], ['text_html', 'excerpt']
+        )
+        last = batch[-1].pk
+        total += len(batch)
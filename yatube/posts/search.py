@@ -0,0 +1,145 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс posts_post_fts хранит текст поста под rowid = Post.id и
+обновляется сигналами сохранения и удаления поста. На других СУБД
+индекса нет, и поиск сводится к icontains по тексту.
+"""
+import re
+
+from django.db import connection
+
+from .feeds import feed
+from .models import Post
+from .paginators import CursorPaginator, parse_rank
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе MATCH: все слова, последнее —
+    как префикс. Операторы FTS5 из запроса не пропускаются."""
+    words = WORD.findall(query)
+    if not words:
+        return ''
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def index_post(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text]
+        )
+
+
+def unindex_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Заново наполняет индекс всеми постами."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+
+
+def matching(queryset, query):
+    """Посты запроса, найденные по индексу (для админки)."""
+    expression = match_expression(query)
+    if not available():
+        return queryset.filter(text__icontains=query)
+    if not expression:
+        return queryset.none()
+    # pk__in=RawSQL(...) в Django 2.2 даёт скалярный подзапрос IN ((...)).
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[expression]
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Результаты поиска по релевантности (bm25), курсор по (rank, id).
+
+    Посты на странице получают атрибут rank; меньший rank — лучше.
+    """
+    parse_key = staticmethod(parse_rank)
+
+    def __init__(self, query, per_page):
+        self.expression = match_expression(query)
+        super().__init__(feed(Post.objects.all(), 'group'), per_page,
+                         keys=('rank', 'pk'))
+
+    @property
+    def count(self):
+        if not self.expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [self.expression]
+            )
+            return cursor.fetchone()[0]
+
+    def _rows(self, descending, cursor=None, offset=0):
+        if not self.expression:
+            return []
+        # Страницы идут от лучшего ранга к худшему.
+        order, lookup = ('ASC', '>') if descending else ('DESC', '<')
+        sql = (
+            f'SELECT rowid, rank FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+        params = [self.expression]
+        if cursor is not None:
+            sql += (
+                f' AND (rank {lookup} %s OR (rank = %s AND rowid {lookup} %s))'
+            )
+            params += [cursor[0], cursor[0], cursor[1]]
+        sql += f' ORDER BY rank {order}, rowid {order} LIMIT %s OFFSET %s'
+        params += [self.per_page + 1, offset]
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            ranks = dict(db_cursor.fetchall())
+        posts = self.object_list.filter(pk__in=ranks).in_bulk()
+        rows = []
+        for pk, rank in ranks.items():
+            if pk in posts:
+                posts[pk].rank = rank
+                rows.append(posts[pk])
+        return rows
+
+
+class TextSearchPaginator(CursorPaginator):
+    """Поиск без FTS5: вхождение подстроки, новые посты первыми."""
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            feed(Post.objects.filter(text__icontains=query), 'group')
+            if query else Post.objects.none(),
+            per_page
+        )
+
+
+def paginator(query, per_page):
+    if available():
+        return SearchPaginator(query, per_page)
+    return TextSearchPaginator(query, per_page)
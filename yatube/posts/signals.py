@@ -0,0 +1,99 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import rendering, search, stats, thumbnails, timeline
+from .feed_cache import ALL_FEEDS, bump, post_feeds
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def render_text(sender, instance, **kwargs):
+    rendering.render(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved(sender, instance, **kwargs):
+    saved = instance.pk and Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', 'image').first()
+    # При смене группы пост пропадает из ленты прежней группы.
+    instance._saved_group_id = saved and saved[0]
+    # Варианты прежней картинки новой не подходят, а сама прежняя
+    # картинка может остаться без ссылок.
+    if saved and (saved[1] or '') != (instance.image.name or ''):
+        instance.image_variants = ''
+        instance._replaced_image = saved[1]
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    search.index_post(instance)
+    feeds = post_feeds(instance)
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if saved_group_id:
+        feeds.append(f'group:{saved_group_id}')
+    bump(*feeds)
+    replaced_image = getattr(instance, '_replaced_image', None)
+    if replaced_image:
+        thumbnails.release(replaced_image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'posts_count', -1)
+    search.unindex_post(instance.pk)
+    bump(*post_feeds(instance))
+    thumbnails.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump(ALL_FEEDS)
+
+
+def follow_feeds(follow):
+    # Лента подписок читателя и счётчики в профилях обоих.
+    return [
+        f'follow:{follow.user_id}',
+        f'stats:{follow.user_id}',
+        f'stats:{follow.author_id}',
+    ]
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.user_id, 'following_count', 1)
+        stats.change(instance.author_id, 'followers_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+    bump(*follow_feeds(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.change(instance.user_id, 'following_count', -1)
+    stats.change(instance.author_id, 'followers_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    bump(*follow_feeds(instance))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        UserStats.objects.create(user=instance)
+    # Вход пользователя сохраняет только last_login — ленты не меняются.
+    elif update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        bump(ALL_FEEDS)
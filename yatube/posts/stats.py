@@ -0,0 +1,59 @@
+"""Денормализованные счётчики профиля (UserStats).
+
+Счётчики меняются теми же транзакциями, что пишут Post и Follow;
+расхождения исправляет команда reconcile_stats.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Follow, Post, User, UserStats
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'following_count': (Follow, 'user'),
+    'followers_count': (Follow, 'author'),
+}
+
+
+def counted(users):
+    """Пользователи с фактическими значениями счётчиков."""
+    return users.annotate(**{
+        f'actual_{name}': Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ), 0)
+        for name, (model, field) in COUNTERS.items()
+    })
+
+
+def recount(user_id):
+    """Заново считает счётчики пользователя."""
+    user = counted(User.objects.filter(pk=user_id)).get()
+    stats, _ = UserStats.objects.update_or_create(user_id=user_id, defaults={
+        name: getattr(user, f'actual_{name}') for name in COUNTERS
+    })
+    return stats
+
+
+def change(user_id, name, delta):
+    """Сдвигает счётчик; недостающую запись создаёт при увеличении.
+
+    При уменьшении запись не создаётся: её владелец может удаляться
+    в этой же транзакции каскадом.
+    """
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{name}__gte': -delta})
+    updated = stats.update(**{name: F(name) + delta})
+    if not updated and delta > 0:
+        recount(user_id)
+
+
+def for_user(user):
+    """Счётчики профиля; у старых пользователей создаются при чтении."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount(user.pk)
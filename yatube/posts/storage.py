@@ -0,0 +1,68 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Загрузка по частям пишется во временный файл и одновременно хешируется,
+а затем переименовывается в <каталог>/<2 знака хеша>/<sha256><расширение>.
+Если такой файл уже есть, временный удаляется и посту достаётся имя
+существующего: одинаковые картинки лежат на диске один раз, и их
+варианты из posts/thumbnails.py, чьи имена sorl выводит из имени
+исходника, тоже создаются один раз.
+
+Ссылки на файл считаются по строкам Post с этим именем: thumbnails.release
+удаляет файл и его варианты, когда ни один пост на него больше
+не ссылается. Файлы, загруженные до этого хранилища, не удаляются.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+ADDRESSED_NAME = re.compile(r'(?:.*/)?([0-9a-f]{2})/\1[0-9a-f]{62}(\.\w+)?')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # Окончательное имя выбирает _save по хешу содержимого.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temporary = tempfile.mkstemp(
+            dir=self.path(directory), prefix='.upload-'
+        )
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            digest = digest.hexdigest()
+            extension = os.path.splitext(name)[1].lower()
+            name = os.path.join(
+                directory, digest[:2], digest + extension
+            ).replace('\\', '/')
+            if self.exists(name):
+                return name
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+            # Тот же файл из параллельной загрузки просто перезапишется.
+            os.replace(temporary, self.path(name))
+            if self.file_permissions_mode is not None:
+                os.chmod(self.path(name), self.file_permissions_mode)
+            return name
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+def is_addressed(name):
+    """Имя выдано этим хранилищем: чужие файлы удалять нельзя."""
+    return bool(name) and ADDRESSED_NAME.fullmatch(name) is not None
+
+
+post_images = ContentAddressedStorage()
@@ -0,0 +1,35 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import page_cache
+from posts.forms import CommentForm
+from posts.models import Follow
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, template_name, **args):
+    """Фрагмент, который выводится для каждого пользователя отдельно.
+
+    Шаблону доступны только args (строки и числа) и контекст запроса.
+    """
+    request = context['request']
+    content = render_to_string(template_name, args, request=request)
+    if not getattr(request, 'page_cache', False):
+        return content
+    return mark_safe(page_cache.hole(template_name, args, content))
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_username):
+    user = context['request'].user
+    return user.is_authenticated and Follow.objects.filter(
+        user=user, author__username=author_username
+    ).exists()
+
+
+@register.simple_tag
+def comment_form():
+    return CommentForm()
@@ -0,0 +1,29 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """Картинка поста со srcset по готовым вариантам; если их ещё нет —
+    оригинал. Варианты ставятся в очередь при записи поста."""
+    formats = thumbnails.variants(post) if post.image else {}
+    sources = [
+        {
+            'type': f'image/{format.lower()}',
+            'srcset': ', '.join(
+                f'{variant["url"]} {variant["width"]}w'
+                for variant in variants
+            ),
+            'largest': variants[-1],
+        }
+        for format, variants in formats.items()
+    ]
+    return {
+        'image': post.image,
+        # Последний формат — запасной, его выводит сам <img>.
+        'sources': sources[:-1],
+        'fallback': sources[-1] if sources else None,
+    }
@@ -0,0 +1,224 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import search
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                          UserStats)
+
+
+class GenerateDataTests(TestCase):
+    def generate(self, **options):
+        call_command(
+            'generatedata', users=30, groups=3, posts=200, comments=50,
+            follows=100, batch_size=40, stdout=StringIO(), **options
+        )
+
+    def test_generates_dataset_and_derived_data(self):
+        '''Данные создаются вместе со счётчиками, лентами и индексом'''
+        self.generate()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertEqual(Follow.objects.count(), 100)
+        self.assertEqual(UserStats.objects.count(), 30)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count()
+        )
+        self.assertTrue(search.matching(Post.objects.all(), 'кошка'))
+
+    def test_follower_counts_are_skewed(self):
+        '''Подписчики распределены со степенным перекосом'''
+        self.generate(skew=2)
+        counts = list(UserStats.objects.order_by(
+            '-followers_count'
+        ).values_list('followers_count', flat=True))
+        self.assertGreater(counts[0], 10 * max(counts[len(counts) // 2], 1))
+
+    def test_dates_are_spread(self):
+        '''Даты постов разнесены по заданному периоду'''
+        self.generate(days=30)
+        first, last = Post.objects.order_by('pub_date')[::199]
+        self.assertGreater((last.pub_date - first.pub_date).days, 7)
+
+
+class BenchmarkTests(TestCase):
+    def test_reports_percentiles_as_json(self):
+        '''Отчёт содержит перцентили и число запросов по каждой view'''
+        call_command(
+            'generatedata', users=10, groups=2, posts=50, comments=20,
+            follows=30, stdout=StringIO()
+        )
+        out = StringIO()
+        call_command('benchmark', requests=5, warmup=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['dataset']['posts'], 50)
+        for view in ('index', 'group_list', 'profile', 'post_detail',
+                     'follow_index'):
+            with self.subTest(view=view):
+                result = report['views'][view]
+                self.assertEqual(result['requests'], 5)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries_max'], 0)
+
+
+class ImportPostsTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Ivan')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+
+    def write(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w') as source:
+            source.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def load(self, kind, path, *args):
+        out = StringIO()
+        call_command('importposts', kind, path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_imports_ndjson_with_derived_data(self):
+        '''Посты из NDJSON загружаются со счётчиками и индексом'''
+        path = self.write('.ndjson', '\n'.join(json.dumps(row) for row in [
+            {'id': 100, 'author_username': 'Ivan', 'group_slug': 'test-slug',
+             'pub_date': '2020-05-01T10:00:00+00:00', 'text': 'кошка'},
+            {'id': 101, 'author_username': 'Ivan', 'group_slug': None,
+             'pub_date': '2020-05-02', 'text': 'собака'},
+            {'id': 102, 'author_username': 'Nobody', 'text': 'пропуск'},
+            {'id': 103, 'author_username': 'Ivan', 'group_slug': 'other',
+             'text': 'пропуск'},
+        ]))
+        out = self.load('posts', path, '--batch-size=2')
+        self.assertIn('Пропущено строк без автора, группы или поста: 2', out)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(Post.objects.count(), 2)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertTrue(search.matching(Post.objects.all(), 'кошка'))
+
+    def test_imports_csv_comments_creating_authors(self):
+        '''Комментарии из CSV; неизвестные авторы создаются'''
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = self.write('.csv', (
+            'id,post_id,author_username,created,text\n'
+            f'1,{post.pk},Petr,2021-01-01T00:00:00+00:00,"Да, верно"\n'
+            '2,999,Petr,,Нет поста\n'
+        ))
+        self.load('comments', path, '--create-missing', '--no-rebuild')
+        comment = Comment.objects.get()
+        self.assertEqual(comment.author.username, 'Petr')
+        self.assertEqual(comment.text, 'Да, верно')
+        self.assertEqual(comment.created.year, 2021)
+
+    def test_round_trip_with_deferred_indexes(self):
+        '''Выгрузка exportposts загружается обратно, индексы на месте'''
+        Post.objects.create(text='Пост', author=self.author, group=self.group)
+        path = self.write('.csv.gz', '')
+        call_command(
+            'exportposts', 'posts', '--format=csv', '--gzip',
+            f'--output={path}'
+        )
+        Post.objects.all().delete()
+        self.load('posts', path, '--defer-indexes')
+        self.assertEqual(Post.objects.get().group, self.group)
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        self.assertIn('post_author_pub_date_idx', indexes)
+
+    def test_bad_row_reported(self):
+        '''Неверная дата останавливает загрузку с понятной ошибкой'''
+        path = self.write('.ndjson', json.dumps(
+            {'author_username': 'Ivan', 'pub_date': 'вчера', 'text': '-'}
+        ))
+        with self.assertRaisesMessage(CommandError, 'Неверная дата'):
+            self.load('posts', path)
+
+    def test_repeated_import_skips_taken_ids(self):
+        '''Повторная загрузка пропускает занятые id, а не падает'''
+        path = self.write('.ndjson', '\n'.join(json.dumps(row) for row in [
+            {'id': 100, 'author_username': 'Ivan', 'text': 'кошка'},
+            {'id': 101, 'author_username': 'Ivan', 'text': 'собака'},
+            {'id': 101, 'author_username': 'Ivan', 'text': 'дубль'},
+        ]))
+        out = self.load('posts', path, '--batch-size=2')
+        self.assertIn('Пропущено строк с уже занятым id: 1', out)
+        out = self.load('posts', path)
+        self.assertIn('Пропущено строк с уже занятым id: 3', out)
+        self.assertNotIn('без автора', out)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Post.objects.get(pk=101).text, 'собака')
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+
+    def test_failure_keeps_derived_data_consistent(self):
+        '''После ошибки загруженные пачки получают счётчики и индекс'''
+        path = self.write('.ndjson', '\n'.join(json.dumps(row) for row in [
+            {'author_username': 'Ivan', 'text': 'кошка'},
+            {'author_username': 'Ivan', 'pub_date': 'вчера', 'text': '-'},
+        ]))
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, 'загружено: 1'):
+            call_command(
+                'importposts', 'posts', path, '--batch-size=1', stdout=out
+            )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertTrue(search.matching(Post.objects.all(), 'кошка'))
+
+    def test_integrity_error_reported(self):
+        '''Нарушение ограничений БД — ошибка команды, а не трассировка'''
+        path = self.write('.ndjson', json.dumps(
+            {'author_username': 'Ivan', 'text': None}
+        ))
+        with mock.patch.object(
+            Post.objects, 'bulk_create', side_effect=IntegrityError('дубль')
+        ):
+            with self.assertRaisesMessage(CommandError, 'дубль'):
+                self.load('posts', path)
+
+    @override_settings(TIMELINE_BACKFILL=1)
+    def test_timeline_rebuilt_for_imported_authors(self):
+        '''Загрузка постов раскладывает в ленты все посты своих авторов
+        и не трогает ленты остальных'''
+        reader = User.objects.create_user(username='Petr')
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=reader, author=self.author)
+        Follow.objects.create(user=reader, author=other)
+        Post.objects.create(text='Чужой пост', author=other)
+        # Полная пересборка вернула бы эту запись.
+        TimelineEntry.objects.filter(author=other).delete()
+        path = self.write('.ndjson', '\n'.join(
+            json.dumps({'author_username': 'Ivan', 'text': f'Пост {number}'})
+            for number in range(3)
+        ))
+        self.load('posts', path)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 3
+        )
+        self.assertFalse(TimelineEntry.objects.filter(author=other).exists())
+        with mock.patch('posts.timeline.rebuild') as rebuild:
+            self.load('comments', self.write('.csv', (
+                'id,post_id,author_username,created,text\n'
+            )))
+        rebuild.assert_not_called()
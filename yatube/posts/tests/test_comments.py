@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from yatube.settings import COMMENTS_ON_PAGE
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author
+        )
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+        cls.POST_COMMENTS_URL = reverse(
+            'posts:post_comments', args=[cls.post.id]
+        )
+
+    def setUp(self):
+        self.guest = Client()
+        cache.clear()
+
+    def add_comments(self, count):
+        start = User.objects.count()
+        users = [
+            User.objects.create_user(username=f'reader-{start + i}')
+            for i in range(count)
+        ]
+        for user in users:
+            Comment.objects.create(post=self.post, author=user, text='-')
+        return list(Comment.objects.order_by('-created', '-pk'))
+
+    def test_detail_shows_first_page(self):
+        '''На странице поста только первая страница комментариев'''
+        comments = self.add_comments(COMMENTS_ON_PAGE + 5)
+        response = self.guest.get(self.POST_DETAIL_URL)
+        page = response.context['comments']
+        self.assertEqual(list(page), comments[:COMMENTS_ON_PAGE])
+        self.assertContains(
+            response, f'{self.POST_COMMENTS_URL}?after={page.next_cursor}'
+        )
+
+    def test_detail_query_count_does_not_grow(self):
+        '''Число запросов не зависит от числа комментариев'''
+        self.add_comments(3)
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.guest.get(self.POST_DETAIL_URL)
+        self.add_comments(COMMENTS_ON_PAGE * 2)
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.guest.get(self.POST_DETAIL_URL)
+
+    def test_next_page_fragment(self):
+        '''Фрагмент отдаёт следующую страницу и ссылку на ещё одну'''
+        comments = self.add_comments(COMMENTS_ON_PAGE * 2 + 1)
+        first = self.guest.get(self.POST_DETAIL_URL).context['comments']
+        response = self.guest.get(
+            self.POST_COMMENTS_URL, {'after': first.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertNotContains(response, '<html')
+        second = response.context['comments']
+        self.assertEqual(
+            list(second), comments[COMMENTS_ON_PAGE:COMMENTS_ON_PAGE * 2]
+        )
+        last = self.guest.get(
+            self.POST_COMMENTS_URL, {'after': second.next_cursor}
+        ).context['comments']
+        self.assertEqual(list(last), comments[COMMENTS_ON_PAGE * 2:])
+        self.assertIsNone(last.next_cursor)
+
+    def test_next_page_json(self):
+        '''Следующая страница в JSON'''
+        comments = self.add_comments(COMMENTS_ON_PAGE + 1)
+        first = self.guest.get(self.POST_DETAIL_URL).context['comments']
+        data = self.guest.get(
+            self.POST_COMMENTS_URL,
+            {'after': first.next_cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [comments[-1].pk]
+        )
+        self.assertEqual(
+            data['comments'][0]['author'], comments[-1].author.username
+        )
+        self.assertIsNone(data['next'])
+
+    def test_comments_of_missing_post(self):
+        '''Комментарии несуществующего поста — 404'''
+        response = self.guest.get(
+            reverse('posts:post_comments', args=[self.post.id + 1])
+        )
+        self.assertEqual(response.status_code, 404)
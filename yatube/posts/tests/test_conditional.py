@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Comment, Follow, Group, Post, User
+
+INDEX_URL = reverse('posts:index')
+SLUG = 'test-slug'
+GROUP_LIST_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=['Ivan'])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(
+            title='Группа', slug=SLUG, description='-'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author, group=cls.group
+        )
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', args=[cls.post.id]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def revalidate(self, client, url):
+        response = client.get(url)
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_answer_304_without_templates(self):
+        '''Неизменная страница — 304 без вывода шаблонов'''
+        for url in (INDEX_URL, GROUP_LIST_URL, PROFILE_URL,
+                    self.POST_DETAIL_URL):
+            with self.subTest(url=url):
+                response = self.revalidate(self.guest, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_if_modified_since(self):
+        '''Last-Modified проверяется через If-Modified-Since'''
+        response = self.guest.get(self.POST_DETAIL_URL)
+        self.assertEqual(self.guest.get(
+            self.POST_DETAIL_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code, 304)
+        self.assertEqual(self.guest.get(
+            self.POST_DETAIL_URL, HTTP_IF_MODIFIED_SINCE=http_date(0)
+        ).status_code, 200)
+
+    def test_changes_invalidate_validators(self):
+        '''Правка поста, комментарий и подписка меняют ETag'''
+        changes = [
+            [self.POST_DETAIL_URL, lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='-'
+            )],
+            [GROUP_LIST_URL, lambda: Post.objects.filter(
+                pk=self.post.pk
+            ).first().save()],
+            [PROFILE_URL, lambda: Follow.objects.create(
+                user=self.user, author=self.author
+            )],
+        ]
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer_and_page(self):
+        '''ETag различается у зрителей и страниц'''
+        etags = {
+            self.guest.get(INDEX_URL)['ETag'],
+            self.client.get(INDEX_URL)['ETag'],
+            self.guest.get(INDEX_URL, {'page': 2})['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_cache_control(self):
+        '''Анонимам — public для прокси, пользователям — private'''
+        anonymous = self.guest.get(INDEX_URL)['Cache-Control']
+        self.assertIn('public', anonymous)
+        self.assertIn('s-maxage', anonymous)
+        private = self.client.get(INDEX_URL)['Cache-Control']
+        self.assertIn('private', private)
+        self.assertIn('no-cache', private)
+        for client in (self.guest, self.client):
+            self.assertIn('Cookie', client.get(INDEX_URL)['Vary'])
+
+    def test_missing_pages_still_404(self):
+        '''Несуществующие группа и профиль — 404'''
+        for url in (reverse('posts:group_list', args=['nope']),
+                    reverse('posts:profile', args=['nope'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest.get(url).status_code, 404)
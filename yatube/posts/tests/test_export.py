@@ -0,0 +1,139 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.reader = User.objects.create_user(username='Petr')
+        cls.staff = User.objects.create_user(username='Admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+        cls.old = Post.objects.create(text='Старый', author=cls.author)
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        cls.post = Post.objects.create(
+            text='Новый, "с запятой"', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Да')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, kind, **params):
+        response = self.staff_client.get(
+            reverse('posts:export', args=[kind]), params
+        )
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def ndjson(self, kind, **params):
+        return [
+            json.loads(line)
+            for line in self.export(kind, **params).decode().splitlines()
+        ]
+
+    def test_export_staff_only(self):
+        '''Выгрузка доступна только staff'''
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:export', args=['posts']))
+        self.assertEqual(response.status_code, 302)
+
+    def test_posts_ndjson(self):
+        '''Посты выгружаются построчно в NDJSON'''
+        rows = self.ndjson('posts')
+        self.assertEqual([row['id'] for row in rows], [
+            self.old.pk, self.post.pk
+        ])
+        self.assertEqual(rows[1]['author_username'], 'Ivan')
+        self.assertEqual(rows[1]['group_slug'], 'test-slug')
+        self.assertEqual(rows[1]['text'], self.post.text)
+
+    def test_dates_keep_microseconds(self):
+        '''Даты в NDJSON и CSV одинаковы и не теряют микросекунды'''
+        moment = timezone.now().replace(microsecond=123456)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=moment)
+        [*_, row] = self.ndjson('posts')
+        [*_, line] = csv.reader(
+            self.export('posts', format='csv').decode().splitlines()
+        )
+        self.assertEqual(row['pub_date'], moment.isoformat())
+        self.assertEqual(line[3], moment.isoformat())
+
+    def test_csv_with_header(self):
+        '''CSV начинается с заголовка и экранирует текст'''
+        rows = list(csv.reader(
+            self.export('posts', format='csv').decode().splitlines()
+        ))
+        self.assertEqual(rows[0][:3], ['id', 'author_username', 'group_slug'])
+        self.assertEqual(rows[2][4], self.post.text)
+
+    def test_filters(self):
+        '''Фильтры по дате и группе'''
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(
+            [row['id'] for row in self.ndjson('posts', since=since)],
+            [self.post.pk]
+        )
+        self.assertEqual(
+            [row['id'] for row in self.ndjson('posts', until=since)],
+            [self.old.pk]
+        )
+        self.assertEqual(len(self.ndjson('comments', group='test-slug')), 1)
+        self.assertEqual(self.ndjson('comments', group='other'), [])
+
+    def test_gzip(self):
+        '''gzip=1 сжимает выгрузку на лету'''
+        rows = gzip.decompress(
+            self.export('follows', gzip='1')
+        ).decode().splitlines()
+        self.assertEqual(json.loads(rows[0])['user_username'], 'Petr')
+
+    def test_bad_parameters(self):
+        '''Неверные параметры дают 400, неизвестная выгрузка — 404'''
+        for kind, params in (
+            ('posts', {'format': 'xml'}),
+            ('posts', {'since': 'вчера'}),
+            ('follows', {'group': 'test-slug'}),
+        ):
+            with self.subTest(params=params):
+                response = self.staff_client.get(
+                    reverse('posts:export', args=[kind]), params
+                )
+                self.assertEqual(response.status_code, 400)
+        response = self.staff_client.get(
+            reverse('posts:export', args=['users'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_command_writes_file(self):
+        '''exportposts пишет выгрузку в файл'''
+        handle, path = tempfile.mkstemp(suffix='.csv.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'exportposts', 'comments', '--format=csv', '--gzip',
+            f'--output={path}'
+        )
+        with gzip.open(path, 'rt') as output:
+            rows = list(csv.reader(output))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2], 'Petr')
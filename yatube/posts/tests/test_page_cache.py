@@ -0,0 +1,161 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.feed_cache import bump, get_versions
+from posts.models import FeedVersion, Follow, Post, User
+
+INDEX_URL = reverse('posts:index')
+PROFILE_URL = reverse('posts:profile', args=['Ivan'])
+HOLES = {
+    'includes/header.html',
+    'posts/includes/follow_button.html',
+    'posts/includes/edit_button.html',
+    'posts/includes/comment_form.html',
+    'posts/includes/switcher.html',
+}
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author
+        )
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', args=[cls.post.id]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_anonymous_page_served_whole(self):
+        '''Повторная страница анониму — без шаблонов и запросов к БД'''
+        first = self.guest.get(INDEX_URL)
+        # Только версии лент из БД.
+        with self.assertNumQueries(1):
+            second = self.guest.get(INDEX_URL)
+        self.assertEqual(second.templates, [])
+        self.assertEqual(second.content, first.content)
+        self.assertNotIn(b'<!--personal', second.content)
+
+    def test_extra_query_shares_cached_page(self):
+        '''Посторонние параметры запроса не заводят новую страницу
+        в кеше, параметры страницы — заводят'''
+        self.guest.get(INDEX_URL)
+        with self.assertNumQueries(1):
+            response = self.guest.get(INDEX_URL, {'utm_source': 'mail'})
+        self.assertEqual(response.templates, [])
+        response = self.guest.get(INDEX_URL, {'page': 2})
+        self.assertNotEqual(response.templates, [])
+
+    def test_users_get_cached_body_with_own_holes(self):
+        '''Пользователю из кеша выводятся только личные фрагменты'''
+        self.guest.get(PROFILE_URL)
+        response = self.user_client.get(PROFILE_URL)
+        self.assertTrue(
+            {template.name for template in response.templates} <= HOLES
+        )
+        self.assertContains(response, 'StasBasov')
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=['Ivan'])
+        )
+        self.assertContains(response, 'Тестовый текст')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertContains(
+            self.user_client.get(PROFILE_URL),
+            reverse('posts:profile_unfollow', args=['Ivan'])
+        )
+        self.assertNotContains(
+            self.author_client.get(PROFILE_URL), 'Подписаться'
+        )
+
+    def test_post_detail_holes(self):
+        '''Кнопка правки и форма комментария — только своим'''
+        edit_url = reverse('posts:post_edit', args=[self.post.id])
+        self.assertNotContains(self.guest.get(self.POST_DETAIL_URL), edit_url)
+        user_page = self.user_client.get(self.POST_DETAIL_URL)
+        self.assertNotContains(user_page, edit_url)
+        self.assertContains(user_page, 'csrfmiddlewaretoken')
+        self.assertContains(self.author_client.get(
+            self.POST_DETAIL_URL
+        ), edit_url)
+
+    def test_switcher_not_shared(self):
+        '''Вкладки лент выводятся каждому своим, в каком бы порядке
+        ни заполнялся кеш'''
+        for first, second in (
+            (self.guest, self.user_client), (self.user_client, self.guest)
+        ):
+            with self.subTest(first=first):
+                cache.clear()
+                first.get(INDEX_URL)
+                self.assertNotContains(
+                    self.guest.get(INDEX_URL), FOLLOW_INDEX_URL
+                )
+                self.assertContains(
+                    self.user_client.get(INDEX_URL), FOLLOW_INDEX_URL
+                )
+
+    def test_versions_shared_between_processes(self):
+        '''Версии лент лежат в БД, а не в кеше процесса'''
+        bump('index')
+        version = get_versions('index')
+        # Кеш процесса другого воркера пуст.
+        cache.clear()
+        self.assertEqual(get_versions('index'), version)
+        # Сдвиг — вставка недостающих строк и один UPDATE.
+        with self.assertNumQueries(2):
+            bump('index', 'group:1')
+        self.assertGreater(get_versions('index'), version)
+
+    def test_reads_do_not_create_versions(self):
+        '''Чтение ленты не пишет версий в БД'''
+        FeedVersion.objects.all().delete()
+        self.guest.get(INDEX_URL)
+        self.guest.get(self.POST_DETAIL_URL)
+        self.assertFalse(FeedVersion.objects.exists())
+
+    def test_missing_post_not_cached(self):
+        '''Страница несуществующего поста — 404 без версий и ETag'''
+        response = self.guest.get(
+            reverse('posts:post_detail', args=[self.post.pk + 1000])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_cached_page_follows_writes(self):
+        '''Новый пост сбрасывает страницу в кеше'''
+        self.guest.get(INDEX_URL)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertContains(self.guest.get(INDEX_URL), 'Новый пост')
+
+    def test_cached_page_cuts_work_for_users(self):
+        '''Из кеша пользователю — меньше запросов к БД'''
+        cache.clear()
+        # Автор, сессия, пользователь, версии, счётчики, посты, подписка.
+        with self.assertNumQueries(7):
+            self.user_client.get(PROFILE_URL)
+        # Автор, сессия, пользователь, версии, подписка.
+        with self.assertNumQueries(5):
+            self.user_client.get(PROFILE_URL)
+
+
+class BumpOnCommitTests(TransactionTestCase):
+    def test_versions_bumped_again_on_commit(self):
+        '''Версии сдвигаются и при записи, и после фиксации'''
+        author = User.objects.create_user(username='Ivan')
+        with transaction.atomic():
+            Post.objects.create(text='Новый пост', author=author)
+            during = get_versions('index')
+        self.assertGreater(get_versions('index'), during)
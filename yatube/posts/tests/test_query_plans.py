@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.test import TestCase
+
+from posts import feeds
+from posts.models import Follow, Group, Post, User
+from posts.paginators import fetch, ordered
+from posts.timeline import TimelinePaginator
+
+MOMENT = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы лент идут по индексу и без сортировки во
+    временном B-дереве — и на первой странице, и после курсора."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='Группа', slug='slug')
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.user, group=cls.group
+        )
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, queryset, table, index, bound=None):
+        plan = self.plan(queryset)
+        self.assertFalse(
+            [step for step in plan if 'TEMP B-TREE' in step], plan
+        )
+        self.assertTrue(
+            [step for step in plan if table in step and index in step], plan
+        )
+        if bound:
+            # Обход индекса начинается от курсора, а не с начала ленты.
+            self.assertTrue(
+                [step for step in plan if bound in step], plan
+            )
+
+    def page_queries(self, queryset, keys=('pub_date', 'pk')):
+        # Запросы собираются так же, как в fetch().
+        return {
+            'first': (ordered(queryset, keys, True)[:11], None),
+            'cursor': (
+                ordered(queryset, keys, True, (MOMENT, 1))[:11],
+                'pub_date<'
+            ),
+            'from_end': (
+                ordered(queryset, keys, False, (MOMENT, 1))[:11],
+                'pub_date>'
+            ),
+        }
+
+    def test_feed_queries(self):
+        '''Ленты главной, группы и профиля идут по индексу даты'''
+        cases = {
+            'index': (feeds.index_feed(), 'pub_date'),
+            'group_list': (
+                feeds.group_feed(self.group), 'post_group_pub_date_idx'
+            ),
+            'profile': (
+                feeds.profile_feed(self.user), 'post_author_pub_date_idx'
+            ),
+        }
+        for view, (queryset, index) in cases.items():
+            for page, (query, bound) in self.page_queries(
+                queryset
+            ).items():
+                with self.subTest(view=view, page=page):
+                    self.assertIndexed(query, 'posts_post', index, bound)
+
+    def test_follow_timeline_query(self):
+        '''Лента подписок идёт по индексу (user, pub_date)'''
+        paginator = TimelinePaginator(self.user, 10)
+        cases = {
+            'first': (paginator.keys_query(True), None),
+            'cursor': (
+                paginator.keys_query(True, (MOMENT, 1)), 'pub_date<'
+            ),
+            'from_end': (
+                paginator.keys_query(False, (MOMENT, 1)), 'pub_date>'
+            ),
+        }
+        for page, (query, bound) in cases.items():
+            with self.subTest(page=page):
+                self.assertIndexed(
+                    query[:11], 'posts_timelineentry',
+                    'timeline_user_pub_date_idx', bound
+                )
+
+    def test_comments_query(self):
+        '''Комментарии поста идут по индексу (post, created)'''
+        comments = self.post.comments.select_related('author')
+        self.assertIndexed(
+            comments, 'posts_comment', 'comment_post_created_idx'
+        )
+
+    def test_followers_query(self):
+        '''Подписчики автора читаются по индексу (author, user)'''
+        followers = Follow.objects.filter(author=self.user).values_list(
+            'user_id', flat=True
+        )
+        self.assertIndexed(
+            followers, 'posts_follow', 'follow_author_user_idx'
+        )
+
+    def test_fetch_uses_same_query_shape(self):
+        '''Проверяемые запросы совпадают с запросами пагинатора'''
+        self.assertEqual(
+            fetch(feeds.index_feed(), ('pub_date', 'pk'), 11, True),
+            list(self.page_queries(feeds.index_feed())['first'][0])
+        )
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+
+@override_settings(TEXT_EXCERPT_LENGTH=20)
+class RenderedTextTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_save_renders_text(self):
+        '''При сохранении текст экранируется и размечается абзацами'''
+        post = Post.objects.create(
+            text='Первая <b>строка</b>\nвторая\n\nещё абзац с длинным текстом',
+            author=self.author
+        )
+        self.assertEqual(
+            post.text_html,
+            '<p>Первая &lt;b&gt;строка&lt;/b&gt;<br>вторая</p>\n\n'
+            '<p>ещё абзац с длинным текстом</p>'
+        )
+        self.assertEqual(post.excerpt, 'Первая <b>строка</b…')
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='a\nb'
+        )
+        self.assertEqual(comment.text_html, '<p>a<br>b</p>')
+
+    def test_pages_output_rendered_text(self):
+        '''Страницы выводят готовый HTML, заголовок — выдержку'''
+        post = Post.objects.create(
+            text='Текст <i>поста</i> длиннее выдержки', author=self.author
+        )
+        Comment.objects.create(post=post, author=self.author, text='<i>к</i>')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, post.text_html, html=True)
+        self.assertContains(response, '<p>&lt;i&gt;к&lt;/i&gt;</p>')
+        self.assertEqual(post.excerpt, 'Текст <i>поста</i> …')
+        self.assertContains(
+            response, '<title>Текст &lt;i&gt;поста&lt;/i&gt; …</title>',
+            html=True
+        )
+
+    def test_rendertext_backfills(self):
+        '''rendertext пересчитывает HTML, записанный в обход save'''
+        post = Post.objects.create(text='Старый', author=self.author)
+        Post.objects.update(text='Новый', text_html='', excerpt='')
+        call_command('rendertext', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый</p>')
+        self.assertEqual(post.excerpt, 'Новый')
@@ -0,0 +1,104 @@
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.paginators import encode_cursor
+
+from posts.models import Post, User
+
+SEARCH_URL = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.cat = Post.objects.create(
+            text='Кошка спит на окне', author=cls.author
+        )
+        cls.dog = Post.objects.create(
+            text='Собака и кошка гуляют', author=cls.author
+        )
+        cls.other = Post.objects.create(
+            text='Про погоду', author=cls.author
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(SEARCH_URL, {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_search_finds_posts_by_word_prefix(self):
+        '''Поиск находит посты по началу слова без учёта регистра'''
+        self.assertEqual(
+            set(self.found('КОШ')), {self.cat, self.dog}
+        )
+        self.assertEqual(list(self.found('погод')), [self.other])
+
+    def test_search_requires_all_words(self):
+        '''Пост должен содержать все слова запроса'''
+        self.assertEqual(list(self.found('собака кошка')), [self.dog])
+
+    def test_search_ignores_query_syntax(self):
+        '''Операторы FTS5 в запросе не ломают поиск'''
+        for query in ('"', 'кошка OR NOT', 'text:*', '', '()'):
+            with self.subTest(query=query):
+                self.found(query)
+        self.assertEqual(list(self.found('')), [])
+
+    def test_index_follows_post_changes(self):
+        '''Индекс обновляется при правке и удалении поста'''
+        post = Post.objects.get(pk=self.other.pk)
+        post.text = 'Про снег'
+        post.save()
+        self.assertEqual(list(self.found('погод')), [])
+        self.assertEqual(list(self.found('снег')), [post])
+        post.delete()
+        self.assertEqual(list(self.found('снег')), [])
+
+    def test_search_pages_by_cursor(self):
+        '''Курсор следующей страницы продолжает выдачу по рангу'''
+        Post.objects.bulk_create(
+            Post(text=f'Кошка номер {i}', author=self.author)
+            for i in range(12)
+        )
+        search.rebuild()
+        first = self.found('кошка')
+        second = self.found('кошка', after=first.next_cursor)
+        seen = [post.pk for post in [*first, *second]]
+        self.assertEqual(len(seen), 14)
+        self.assertEqual(len(set(seen)), 14)
+        ranks = [post.rank for post in [*first, *second]]
+        self.assertEqual(ranks, sorted(ranks))
+        previous = self.found('кошка', before=second.previous_cursor)
+        self.assertEqual(list(previous), list(first))
+
+    def test_date_cursor_returns_first_page(self):
+        '''Курсор ленты с датой в поиске открывает первую страницу'''
+        cursor = encode_cursor(2, self.cat.pub_date, self.cat.pk)
+        page = self.found('кошка', after=cursor)
+        self.assertEqual(page.number, 1)
+        self.assertEqual(set(page), {self.cat, self.dog})
+
+    def test_paginator_links_keep_query(self):
+        '''Ссылки пагинатора сохраняют строку запроса'''
+        Post.objects.bulk_create(
+            Post(text=f'Кошка номер {i}', author=self.author)
+            for i in range(12)
+        )
+        search.rebuild()
+        response = self.client.get(SEARCH_URL, {'q': 'кошка'})
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&')
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке идёт через индекс'''
+        request = RequestFactory().get('/')
+        queryset, distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'кош'
+        )
+        self.assertEqual(set(queryset), {self.cat, self.dog})
+        self.assertFalse(distinct)
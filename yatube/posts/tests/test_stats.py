@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, User, UserStats
+
+AUTHOR_USERNAME = 'Ivan'
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+PROFILE_FOLLOW_URL = reverse('posts:profile_follow', args=[AUTHOR_USERNAME])
+PROFILE_UNFOLLOW_URL = reverse(
+    'posts:profile_unfollow',
+    args=[AUTHOR_USERNAME]
+)
+POST_CREATE_URL = reverse('posts:post_create')
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username='StasBasov')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def counters(self, user):
+        stats = UserStats.objects.get(user=user)
+        return [
+            stats.posts_count, stats.following_count, stats.followers_count
+        ]
+
+    def test_write_paths_keep_counters(self):
+        '''Публикация, подписка и отписка меняют счётчики'''
+        self.author_client.post(POST_CREATE_URL, {'text': 'Текст'})
+        self.client.get(PROFILE_FOLLOW_URL)
+        self.assertEqual(self.counters(self.author), [1, 0, 1])
+        self.assertEqual(self.counters(self.user), [0, 1, 0])
+        self.client.get(PROFILE_UNFOLLOW_URL)
+        Post.objects.filter(author=self.author).delete()
+        self.assertEqual(self.counters(self.author), [0, 0, 0])
+        self.assertEqual(self.counters(self.user), [0, 0, 0])
+
+    def test_cascade_delete_keeps_counters(self):
+        '''Удаление пользователя уменьшает счётчики его авторов'''
+        Follow.objects.create(user=self.user, author=self.author)
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertEqual(self.counters(self.author), [0, 0, 0])
+
+    def test_profile_shows_counters(self):
+        '''Профиль выводит счётчики из UserStats'''
+        UserStats.objects.filter(user=self.author).update(followers_count=7)
+        response = self.client.get(PROFILE_URL)
+        self.assertContains(response, 'Подписчиков: 7')
+
+    def test_reconcile_stats_fixes_drift(self):
+        '''reconcile_stats восстанавливает расходящиеся счётчики'''
+        Post.objects.create(text='Текст', author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=5)
+        UserStats.objects.filter(user=self.user).delete()
+        out = StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Создано: 1, исправлено: 1')
+        self.assertEqual(self.counters(self.author), [1, 0, 1])
+        self.assertEqual(self.counters(self.user), [0, 1, 0])
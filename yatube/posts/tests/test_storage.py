@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+
+from posts import thumbnails
+from posts.models import Post, User
+from posts.storage import post_images
+from tasks.models import Task
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+POST_IMAGE_TEST = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name, content=POST_IMAGE_TEST):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=False)
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ivan')
+
+    def create(self, image):
+        return Post.objects.create(text='-', author=self.author, image=image)
+
+    def files(self):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(post_images.path('posts'))
+            for name in names
+        )
+
+    def test_identical_uploads_stored_once(self):
+        '''Одинаковые картинки хранятся одним файлом под хешем'''
+        first = self.create(upload('one.GIF'))
+        second = self.create(upload('two.gif'))
+        other = self.create(upload('three.gif', POST_IMAGE_TEST + b'\x00'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
+        self.assertEqual(len(self.files()), 2)
+        with post_images.open(first.image.name) as image:
+            self.assertEqual(image.read(), POST_IMAGE_TEST)
+
+    def test_file_deleted_with_last_reference(self):
+        '''Файл и его варианты удаляются вместе с последним постом'''
+        first = self.create(upload('one.gif'))
+        second = self.create(upload('two.gif'))
+        thumbnails.generate_variants(first.pk, first.image.name, [])
+        first.refresh_from_db()
+        [variant] = thumbnails.variants(first)['JPEG']
+        first.delete()
+        self.assertTrue(post_images.exists(second.image.name))
+        second.delete()
+        self.assertFalse(post_images.exists(second.image.name))
+        self.assertFalse(default_storage.exists(variant['name']))
+
+    def test_replaced_image_released(self):
+        '''Заменённая картинка без других ссылок удаляется'''
+        post = self.create(upload('one.gif'))
+        old = post.image.name
+        post.image = upload('two.gif', POST_IMAGE_TEST + b'\x00')
+        post.save()
+        self.assertFalse(post_images.exists(old))
+        self.assertTrue(post_images.exists(post.image.name))
+
+    def test_repost_reuses_variants(self):
+        '''Пост с уже встречавшейся картинкой получает готовые варианты
+        без новой задачи'''
+        first = self.create(upload('one.gif'))
+        thumbnails.generate_variants(first.pk, first.image.name, [])
+        second = self.create(upload('two.gif'))
+        thumbnails.schedule(second)
+        second.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertFalse(Task.objects.exists())
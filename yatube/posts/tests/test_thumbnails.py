@@ -0,0 +1,160 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image, features
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+from posts.feed_cache import post_feeds
+from posts.models import Post, User
+from tasks.models import Task
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+POST_IMAGE_TEST = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=POST_IMAGE_TEST,
+                content_type='image/gif'
+            )
+        )
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Страницы лент кешируются целиком.
+        cache.clear()
+
+    def generate(self, post):
+        thumbnails.generate_variants(
+            post.pk, post.image.name, post_feeds(post)
+        )
+        post.refresh_from_db()
+        return thumbnails.variants(post)
+
+    def test_page_does_not_generate_thumbnail(self):
+        '''Без готовых вариантов страница выводит оригинал
+        и ничего не ставит в очередь'''
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = self.client.get(self.POST_DETAIL_URL)
+        schedule.assert_not_called()
+        self.assertContains(response, self.post.image.url)
+        self.assertNotContains(response, 'srcset')
+
+    def test_page_uses_generated_variants(self):
+        '''Созданные в фоне варианты выводятся через srcset'''
+        variants = self.generate(self.post)
+        # Картинка уже самого малого варианта: он один.
+        [variant] = variants['JPEG']
+        self.assertEqual((variant['width'], variant['height']), (480, 170))
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = self.client.get(self.POST_DETAIL_URL)
+        schedule.assert_not_called()
+        self.assertContains(response, f'srcset="{variant["url"]} 480w"')
+        self.assertContains(response, 'width="480" height="170"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_variant_widths_and_formats(self):
+        '''Варианты всех ширин не больше исходной, WebP — если доступен'''
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500)).save(buffer, 'PNG')
+        post = Post.objects.create(
+            text='Большая картинка',
+            author=self.author,
+            image=SimpleUploadedFile('big.png', buffer.getvalue())
+        )
+        variants = self.generate(post)
+        self.assertEqual(
+            [variant['width'] for variant in variants['JPEG']], [480, 960]
+        )
+        for variant in variants['JPEG']:
+            with Image.open(default_storage.open(variant['name'])) as image:
+                self.assertEqual(
+                    image.size, (variant['width'], variant['height'])
+                )
+        with mock.patch.object(features, 'check', return_value=True):
+            self.assertEqual(
+                thumbnails.output_formats(ImageFile(post.image.name)),
+                ['WEBP', 'JPEG']
+            )
+
+    def test_new_image_drops_variants(self):
+        '''Смена картинки сбрасывает варианты прежней'''
+        post = Post.objects.create(
+            text='Пост', author=self.author, image=self.post.image.name
+        )
+        self.generate(post)
+        post.image = SimpleUploadedFile(
+            'other.gif', POST_IMAGE_TEST, content_type='image/gif'
+        )
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+
+    def test_missing_file_marked_once(self):
+        '''Пост без файла картинки отмечается и в очередь больше
+        не встаёт'''
+        post = Post.objects.create(
+            text='Импорт', author=self.author, image='posts/missing.gif'
+        )
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            self.assertEqual(self.generate(post), {})
+        self.assertEqual(post.image_variants, '[]')
+        cache.clear()
+        with mock.patch.object(
+            thumbnails.generate_variants, 'delay'
+        ) as delay:
+            thumbnails.schedule(post)
+        delay.assert_not_called()
+        self.assertContains(
+            self.client.get(reverse('posts:post_detail', args=[post.pk])),
+            post.image.url
+        )
+
+    def test_command_schedules_posts_without_variants(self):
+        '''imagevariants ставит в очередь посты без вариантов'''
+        Post.objects.create(
+            text='Готово', author=self.author, image='posts/done.gif',
+            image_variants='[]'
+        )
+        Post.objects.create(text='Без картинки', author=self.author)
+        with mock.patch.object(
+            thumbnails.generate_variants, 'delay'
+        ) as delay:
+            call_command('imagevariants', stdout=StringIO())
+        delay.assert_called_once_with(
+            self.post.pk, self.post.image.name, post_feeds(self.post)
+        )
+        self.assertFalse(Task.objects.exists())
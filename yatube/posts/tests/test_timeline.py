@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timeline import TimelinePaginator
+
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+AUTHOR_USERNAME = 'Ivan'
+PROFILE_FOLLOW_URL = reverse('posts:profile_follow', args=[AUTHOR_USERNAME])
+PROFILE_UNFOLLOW_URL = reverse(
+    'posts:profile_unfollow',
+    args=[AUTHOR_USERNAME]
+)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.post = Post.objects.create(text='Старый пост', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def timeline(self):
+        return list(self.client.get(FOLLOW_INDEX_URL).context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        '''После подписки в ленте есть прежние посты автора'''
+        self.client.get(PROFILE_FOLLOW_URL)
+        self.assertEqual(self.timeline(), [self.post])
+
+    def test_new_post_fans_out_to_followers(self):
+        '''Новый пост записывается в ленты подписчиков'''
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(self.timeline(), [post, self.post])
+
+    def test_unfollow_prunes_timeline(self):
+        '''После отписки посты автора уходят из ленты'''
+        Follow.objects.create(user=self.user, author=self.author)
+        self.client.get(PROFILE_UNFOLLOW_URL)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.timeline(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_read_on_request(self):
+        '''Посты популярных авторов читаются без размножения'''
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.timeline(), [post, self.post])
+
+    def test_page_offset_applied_in_sql(self):
+        '''Страница по номеру берёт из ленты в SQL только свои id,
+        в том числе вперемешку с постами популярных авторов'''
+        celebrity = User.objects.create_user(username='Celebrity')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=celebrity)
+        for number in range(12):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=celebrity if number % 3 else self.author
+            )
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        for limit in (10 ** 6, 1):
+            with self.subTest(limit=limit), override_settings(
+                TIMELINE_FANOUT_LIMIT=limit
+            ):
+                paginator = TimelinePaginator(self.user, 3)
+                paginator.count
+                with CaptureQueriesContext(connection) as queries:
+                    page = paginator.page(2)
+                self.assertEqual(list(page), expected[3:6])
+                keys, posts = [
+                    query['sql'] for query in queries.captured_queries
+                ]
+                self.assertIn('LIMIT 4 OFFSET 3', keys)
+                self.assertEqual('UNION' in keys, limit == 1)
+                ids = posts.split(' IN (')[1].split(')')[0].split(', ')
+                self.assertEqual(len(ids), 4)
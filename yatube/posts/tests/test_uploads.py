@@ -0,0 +1,183 @@
+import shutil
+import struct
+import tempfile
+import tracemalloc
+import zlib
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.client import FakePayload
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails, uploads
+from posts.models import Post, User
+from posts.storage import post_images
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+POST_CREATE_URL = reverse('posts:post_create')
+POST_IMAGE_TEST = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def chunk(kind, data):
+    return (
+        struct.pack('>I', len(data)) + kind + data
+        + struct.pack('>I', zlib.crc32(kind + data))
+    )
+
+
+def png_bomb(width, height):
+    """PNG в пару сотен байт, заявляющий width x height пикселей."""
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(b'\x00' * 1024, 9)),
+        chunk(b'IEND', b''),
+    ])
+
+
+def image(format, size):
+    output = BytesIO()
+    Image.new('RGB', size, 'red').save(output, format)
+    return output.getvalue()
+
+
+def upload(name, content):
+    return SimpleUploadedFile(name, content)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=False)
+class UploadTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ivan')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create(self, name, content):
+        return self.client.post(POST_CREATE_URL, {
+            'text': 'Текст', 'image': upload(name, content)
+        })
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(message, response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    def test_valid_image_accepted(self):
+        '''Допустимая картинка сохраняется с постом'''
+        self.create('small.gif', POST_IMAGE_TEST)
+        post = Post.objects.get()
+        with post.image.open() as saved:
+            self.assertEqual(saved.read(), POST_IMAGE_TEST)
+
+    @override_settings(UPLOAD_MAX_IMAGE_SIZE=1024)
+    def test_oversized_file_rejected(self):
+        '''Файл больше UPLOAD_MAX_IMAGE_SIZE не сохраняется'''
+        self.assertRejected(
+            self.create('big.png', image('PNG', (1, 1)) + b'\x00' * 4096),
+            'Файл больше'
+        )
+
+    def test_unsupported_format_rejected(self):
+        '''Формат вне UPLOAD_IMAGE_FORMATS не принимается'''
+        self.assertRejected(
+            self.create('image.bmp', image('BMP', (2, 2))),
+            'Формат BMP не поддерживается'
+        )
+
+    @override_settings(UPLOAD_MAX_IMAGE_PIXELS=1)
+    def test_pixel_limit(self):
+        '''Число пикселей проверяется по заголовку'''
+        self.assertRejected(
+            self.create('small.gif', POST_IMAGE_TEST), 'Картинка 2x1'
+        )
+
+    def test_decompression_bomb_rejected(self):
+        '''Бомба отвергается по заголовку, без распаковки'''
+        cases = (
+            (8000, 8000, 'Картинка 8000x8000 больше 40 мегапикселей'),
+            (100000, 100000, 'Слишком большая картинка'),
+        )
+        for width, height, message in cases:
+            with self.subTest(size=(width, height)):
+                self.assertRejected(
+                    self.create('bomb.png', png_bomb(width, height)),
+                    message
+                )
+                bomb = upload('bomb.png', png_bomb(width, height))
+                tracemalloc.start()
+                try:
+                    self.assertTrue(uploads.check(bomb))
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                self.assertLess(peak, 256 * 1024)
+
+    @override_settings(UPLOAD_MAX_IMAGE_SIZE=1024 * 1024)
+    def test_handler_memory_bounded(self):
+        '''Обработчик не держит загрузку в памяти и не пишет лишнего
+        на диск'''
+        handler = uploads.BoundedUploadHandler()
+        data = b'\x00' * 64 * 1024
+        tracemalloc.start()
+        try:
+            handler.new_file('image', 'big.png', 'image/png', None)
+            for start in range(0, 200 * len(data), len(data)):
+                handler.receive_data_chunk(data, start)
+            upload = handler.file_complete(200 * len(data))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 256 * 1024)
+        self.assertIn('Файл больше', upload.upload_error)
+        with open(upload.temporary_file_path(), 'rb') as written:
+            self.assertLessEqual(
+                len(written.read()), settings.UPLOAD_MAX_IMAGE_SIZE
+            )
+        upload.close()
+
+    @override_settings(
+        UPLOAD_MAX_IMAGE_SIZE=1024, UPLOAD_MAX_REQUEST_SIZE=64 * 1024
+    )
+    def test_huge_request_rejected_unread(self):
+        '''Запрос больше UPLOAD_MAX_REQUEST_SIZE получает 413
+        без чтения тела'''
+        with mock.patch.object(FakePayload, 'read') as read:
+            response = self.create(
+                'big.png', image('PNG', (1, 1)) + b'\x00' * 128 * 1024
+            )
+        read.assert_not_called()
+        self.assertEqual(response.status_code, 413)
+        self.assertTemplateUsed(response, 'core/413.html')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_large_original_shrunk_by_worker(self):
+        '''Воркер уменьшает оригинал и удаляет прежний файл'''
+        self.create('large.png', image('PNG', (300, 150)))
+        post = Post.objects.get()
+        original = post.image.name
+        thumbnails.generate_variants(post.pk, original, [])
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, original)
+        self.assertFalse(post_images.exists(original))
+        with post.image.open() as shrunk, Image.open(shrunk) as result:
+            self.assertEqual((result.format, result.size), ('PNG', (100, 50)))
+        self.assertTrue(thumbnails.variants(post))
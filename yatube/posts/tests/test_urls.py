@@ -1,4 +1,5 @@
 from http import HTTPStatus
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls.base import reverse
 
@@ -54,6 +55,10 @@ class PostsURLTests(TestCase):
             args=[cls.post.id]
         )
 
+    def setUp(self):
+        # Страницы лент кешируются целиком.
+        cache.clear()
+
     # Проверяем доступность всех страниц
     def test_accessibility_address(self):
         urls_client_status = [
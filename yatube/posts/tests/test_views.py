@@ -1,14 +1,18 @@
+import base64
 import shutil
 import tempfile
 
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 
-from posts.models import Post, Group, User, Follow
+from posts.models import Comment, Post, Group, User, Follow
+from posts.paginators import CursorPaginator, encode_cursor
 from yatube.settings import POSTS_ON_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -85,6 +89,10 @@ class PostsViewsTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        # Страницы лент кешируются целиком.
+        cache.clear()
+
     def test_pages_show_correct_context(self):
         '''Страницы содержат ожидаемый пост'''
         Follow.objects.create(
@@ -156,13 +164,49 @@ class PostsViewsTests(TestCase):
 
     def test_page_index_cache(self):
         page_content1 = self.guest_client.get(INDEX_URL).content
-        Post.objects.all().delete()
+        # Правка в обход сигналов не сбрасывает кеш ленты.
+        Post.objects.update(
+            text='Новый текст', text_html='<p>Новый текст</p>'
+        )
         page_content2 = self.guest_client.get(INDEX_URL).content
         self.assertEqual(page_content1, page_content2)
         cache.clear()
         page_content3 = self.guest_client.get(INDEX_URL).content
         self.assertNotEqual(page_content1, page_content3)
 
+    def test_feed_cache_invalidated_on_write(self):
+        """Запись поста, группы или комментария сразу видна в лентах."""
+        feeds = [INDEX_URL, GROUP_LIST_URL, PROFILE_URL, self.POST_DETAIL_URL]
+        cached = {url: self.guest_client.get(url).content for url in feeds}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный текст'
+        post.save()
+        for url in feeds[:3]:
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    self.guest_client.get(url).content, cached[url]
+                )
+        cached = self.guest_client.get(self.POST_DETAIL_URL).content
+        post.comments.create(author=self.user, text='Комментарий')
+        self.assertNotEqual(
+            self.guest_client.get(self.POST_DETAIL_URL).content, cached
+        )
+        cached = self.guest_client.get(INDEX_URL).content
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        self.assertNotEqual(self.guest_client.get(INDEX_URL).content, cached)
+
+    def test_feed_cache_depends_on_page(self):
+        """У каждой страницы ленты свой фрагмент кеша."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author)
+            for i in range(POSTS_ON_PAGE)
+        )
+        first = self.guest_client.get(INDEX_URL).content
+        second = self.guest_client.get(INDEX_URL + '?page=2').content
+        self.assertNotEqual(first, second)
+
 
 class PaginatorViewsTest(TestCase):
     '''Проверка пагинатора на страницах: posts:index,
@@ -204,3 +248,176 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(url=url):
                 response = self.client.get(url + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_pages_follow_each_other(self):
+        """Курсоры ведут на соседние страницы без пропусков и повторов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                second = self.client.get(
+                    url, {'after': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertEqual(second.number, 2)
+                self.assertIsNone(second.next_cursor)
+                self.assertEqual(
+                    len({post.pk for post in first} | {
+                        post.pk for post in second
+                    }),
+                    POSTS_ON_PAGE + 3
+                )
+                back = self.client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(back.number, 1)
+                self.assertEqual(list(back), list(first))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.client.get(INDEX_URL, {'after': 'broken'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_PAGE)
+
+    def test_foreign_cursor_returns_first_page(self):
+        """Курсор с ключом чужого типа или мусором открывает первую
+        страницу любой ленты."""
+        cache.clear()
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        post = Post.objects.first()
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий'
+        )
+        cursors = [
+            encode_cursor(2, 1.5, 3),
+            encode_cursor(2, float('nan'), 3),
+            base64.urlsafe_b64encode(b'2|garbage|3').decode(),
+            base64.urlsafe_b64encode(b'2|2021-13-45T00:00:00|3').decode(),
+        ]
+        urls = self.urls + [
+            FOLLOW_INDEX_URL,
+            reverse('posts:post_comments', args=[post.pk]),
+        ]
+        for url in urls:
+            for cursor in cursors:
+                for direction in 'after', 'before':
+                    with self.subTest(url=url, cursor=cursor):
+                        response = self.client.get(url, {direction: cursor})
+                        self.assertEqual(response.status_code, 200)
+                        page = response.context.get(
+                            'page_obj', response.context.get('comments')
+                        )
+                        self.assertEqual(page.number, 1)
+        self.assertEqual(
+            list(self.client.get(
+                reverse('posts:post_comments', args=[post.pk]),
+                {'after': cursors[0]}
+            ).context['comments']),
+            [comment]
+        )
+
+    def test_elided_page_range(self):
+        """Окно номеров страниц не растёт вместе с лентой."""
+        cache.clear()
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        ellipsis = CursorPaginator.ELLIPSIS
+        cases = [
+            [1, [1, 2, 3, ellipsis, 13]],
+            [7, [1, ellipsis, 5, 6, 7, 8, 9, ellipsis, 13]],
+            [13, [1, ellipsis, 11, 12, 13]],
+        ]
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)),
+                    expected
+                )
+
+    def test_pages_near_end_read_from_oldest(self):
+        """Страницы второй половины читаются от старых постов
+        с малым OFFSET и совпадают со срезом ленты."""
+        cache.clear()
+        paginator = CursorPaginator(Post.objects.all(), 2)
+        posts = list(Post.objects.order_by('-pub_date', '-pk'))
+        total = paginator.total_pages
+        for number in range(1, total + 1):
+            with self.subTest(number=number):
+                page = paginator.page(number)
+                self.assertEqual(
+                    list(page), posts[(number - 1) * 2:number * 2]
+                )
+                self.assertEqual(page.has_next(), number < total)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(total)
+        [query] = queries.captured_queries
+        self.assertNotIn('DESC', query['sql'])
+        self.assertNotIn('OFFSET', query['sql'])
+
+
+class FeedQueriesTest(TestCase):
+    '''Число запросов к БД на странице ленты не зависит
+       от числа постов, авторов и групп на ней.'''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug=SLUG,
+            description='Тестовый текст',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_posts(self, count):
+        '''Посты разных авторов и групп, все в лентах пользователя.'''
+        for i in range(count):
+            author = User.objects.create_user(
+                username=f'author-{count}-{i}'
+            )
+            Follow.objects.create(user=self.user, author=author)
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=author,
+                group=Group.objects.create(
+                    title=f'Группа {i}',
+                    slug=f'group-{count}-{i}',
+                    description='-'
+                ),
+            )
+        Post.objects.bulk_create(
+            Post(text='Тестовый текст', author=self.author, group=self.group)
+            for _ in range(count)
+        )
+
+    def assertQueryBudget(self, url, budget):
+        '''Страница укладывается в заданное число запросов.'''
+        cache.clear()
+        with self.assertNumQueries(budget):
+            self.client.get(url)
+
+    def test_feed_query_budget(self):
+        # Первый из запросов — версии лент из таблицы FeedVersion.
+        budgets = [
+            [INDEX_URL, 5],
+            # Плюс запрос id группы, автора или поста для ETag.
+            [GROUP_LIST_URL, 7],
+            [PROFILE_URL, 7],
+            [self.POST_DETAIL_URL, 6],
+            [FOLLOW_INDEX_URL, 7],
+        ]
+        for count in (POSTS_ON_PAGE, POSTS_ON_PAGE * 2):
+            self.add_posts(count)
+            for url, budget in budgets:
+                with self.subTest(url=url, posts=count):
+                    self.assertQueryBudget(url, budget)
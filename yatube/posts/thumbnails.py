@@ -0,0 +1,214 @@
+"""Варианты картинок постов разной ширины, подготовленные заранее.
+
+Варианты создаёт задача очереди tasks после сохранения поста: по одному
+на каждую ширину из POST_IMAGE_WIDTHS в WebP, если Pillow умеет его
+писать, и в запасном формате для остальных браузеров. Имена файлов и
+размеры вариантов записываются в Post.image_variants, и шаблон строит
+srcset только по ним. Шаблоны никогда не открывают картинку в потоке
+запроса и ничего не ставят в очередь: пока вариантов нет, выводится
+оригинал. Посты, загруженные в обход форм, ставит в очередь команда
+imagevariants. Одинаковые картинки хранятся под одним именем
+(posts/storage.py), и пост с уже встречавшейся картинкой получает
+готовые варианты.
+Оригинал со стороной больше POST_IMAGE_MAX_SIDE задача сначала уменьшает.
+"""
+import json
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, features
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .feed_cache import bump, post_feeds
+from .models import Post
+from .storage import is_addressed, post_images
+
+from tasks.queue import task
+
+logger = logging.getLogger(__name__)
+
+# Пропорции рамки картинки в posts/includes/post.html.
+POST_IMAGE_RATIO = 339 / 960
+
+
+def output_formats(source):
+    """Форматы вариантов: WebP, если Pillow его умеет, и запасной."""
+    backend = default.backend
+    fallback = (
+        backend._get_format(source) if sorl_settings.THUMBNAIL_PRESERVE_FORMAT
+        else backend.default_options['format']
+    )
+    if fallback != 'WEBP' and features.check('webp'):
+        return ['WEBP', fallback]
+    return [fallback]
+
+
+def thumbnail_options(format):
+    """Параметры sorl, как в ThumbnailBackend.get_thumbnail."""
+    backend = default.backend
+    options = {'crop': 'center', 'upscale': True, 'format': format}
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def variant_files(name, source_width):
+    """Файлы вариантов картинки шириной до source_width: формат,
+    ширина, высота и ImageFile. Картинка при этом не открывается."""
+    backend = default.backend
+    source = ImageFile(name)
+    widths = [
+        width for width in settings.POST_IMAGE_WIDTHS
+        if width <= source_width
+    ] or settings.POST_IMAGE_WIDTHS[:1]
+    for format in output_formats(source):
+        options = thumbnail_options(format)
+        for width in widths:
+            height = round(width * POST_IMAGE_RATIO)
+            yield format, width, height, ImageFile(
+                backend._get_thumbnail_filename(
+                    source, f'{width}x{height}', options
+                ),
+                default.storage
+            )
+
+
+def generate(name):
+    """Записывает файлы вариантов картинки и возвращает их описания.
+
+    Ширины больше исходной пропускаются, кроме самой малой.
+    """
+    source_image = default.engine.get_image(ImageFile(name))
+    try:
+        image_info = default.engine.get_image_info(source_image)
+        source_width = default.engine.get_image_size(source_image)[0]
+        variants = []
+        for format, width, height, thumbnail in variant_files(
+            name, source_width
+        ):
+            if not thumbnail.exists():
+                default.backend._create_thumbnail(
+                    source_image, f'{width}x{height}', dict(
+                        thumbnail_options(format), image_info=image_info
+                    ),
+                    thumbnail
+                )
+            variants.append({
+                'name': thumbnail.name,
+                'format': format,
+                'width': width,
+                'height': height,
+            })
+    finally:
+        default.engine.cleanup(source_image)
+    return variants
+
+
+def variants(post):
+    """Варианты картинки поста по форматам: {формат: [вариант, ...]},
+    у каждого варианта есть url."""
+    formats = {}
+    for variant in json.loads(post.image_variants or '[]'):
+        variant['url'] = default.storage.url(variant['name'])
+        formats.setdefault(variant['format'], []).append(variant)
+    return formats
+
+
+def shrink(post_id, name):
+    """Уменьшает оригинал картинки поста до POST_IMAGE_MAX_SIDE
+    по большей стороне и возвращает имя, под которым он теперь лежит."""
+    limit = settings.POST_IMAGE_MAX_SIDE
+    with post_images.open(name) as source, Image.open(source) as image:
+        if max(image.size) <= limit:
+            return name
+        format = image.format
+        # JPEG сразу декодируется в уменьшенном в 2-8 раз масштабе.
+        image.draft(image.mode, (limit, limit))
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        output = BytesIO()
+        image.save(output, format)
+    field = Post._meta.get_field('image')
+    shrunk = post_images.save(
+        field.generate_filename(None, os.path.basename(name)),
+        ContentFile(output.getvalue())
+    )
+    if Post.objects.filter(pk=post_id, image=name).update(image=shrunk):
+        release(name)
+    else:
+        release(shrunk)
+    return shrunk
+
+
+@task(unique=True)
+def generate_variants(post_id, name, feeds):
+    try:
+        name = shrink(post_id, name)
+        variants = generate(name)
+    except OSError:
+        # Файла нет или он не читается: повтор не поможет. Пустой список
+        # вариантов отмечает пост, и он выводит оригинал, не вставая
+        # в очередь снова.
+        logger.warning(
+            'Нет вариантов картинки %s поста %s', name, post_id,
+            exc_info=True
+        )
+        variants = []
+    Post.objects.filter(pk=post_id, image=name).update(
+        image_variants=json.dumps(variants)
+    )
+    # Закешированные ленты выводят оригинал вместо вариантов.
+    bump(*feeds)
+
+
+def schedule(post):
+    """Ставит картинку поста в очередь задач после записи поста.
+
+    Пост с уже созданными (или отмеченными как невозможные) вариантами
+    не ставится, как и тот, чья задача ещё ждёт воркера.
+    """
+    name = post.image.name
+    if not name or post.image_variants or not cache.add(
+        f'thumbnail:{post.pk}:{name}', True, settings.TASKS_LOCK_TIMEOUT
+    ):
+        return
+    # Та же картинка у другого поста: её варианты уже готовы.
+    ready = Post.objects.filter(image=name).exclude(
+        image_variants=''
+    ).values_list('image_variants', flat=True).first()
+    if ready:
+        Post.objects.filter(pk=post.pk, image=name).update(
+            image_variants=ready
+        )
+        bump(*post_feeds(post))
+        return
+    generate_variants.delay(post.pk, name, post_feeds(post))
+
+
+def release(name):
+    """После фиксации транзакции удаляет картинку name и все её варианты,
+    если на неё не ссылается ни один пост."""
+    if not is_addressed(name):
+        return
+
+    def delete():
+        if Post.objects.filter(image=name).exists():
+            return
+        try:
+            post_images.delete(name)
+            for *_, thumbnail in variant_files(name, float('inf')):
+                thumbnail.delete()
+        except OSError:
+            logger.exception('Не удалось удалить картинку %s', name)
+    transaction.on_commit(delete)
@@ -0,0 +1,169 @@
+"""Лента подписок, материализованная при публикации (fan-out-on-write).
+
+Новый пост записывается в TimelineEntry каждого подписчика автора,
+и лента читается одним проходом по индексу (user, pub_date).
+Посты авторов, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT,
+не размножаются, а читаются напрямую и подмешиваются к ленте.
+"""
+from django.conf import settings
+from django.db import connection
+
+from .feeds import feed
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import CursorPaginator, after_cursor, cached_count
+
+REBUILD_AUTHORS_BATCH = 500
+
+
+def is_celebrity(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('author_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """После подписки добавляет в ленту последние посты автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=pk,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for pk, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """После отписки убирает посты автора из ленты."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(author_ids=None):
+    """Заново раскладывает посты по лентам после массовой записи,
+    минуя сигналы: как и fan_out, все посты каждой подписки.
+
+    С author_ids пересобираются только записи этих авторов.
+    """
+    if author_ids is None:
+        TimelineEntry.objects.all().delete()
+        rebuild_authors(None)
+        return
+    author_ids = sorted(author_ids)
+    # Пачками: у SQLite ограничено число параметров запроса.
+    for start in range(0, len(author_ids), REBUILD_AUTHORS_BATCH):
+        batch = author_ids[start:start + REBUILD_AUTHORS_BATCH]
+        TimelineEntry.objects.filter(author_id__in=batch).delete()
+        rebuild_authors(batch)
+
+
+def rebuild_authors(author_ids):
+    where, params = '', []
+    if author_ids is not None:
+        where = f'AND f.author_id IN ({", ".join(["%s"] * len(author_ids))})'
+        params = list(author_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+            f'LEFT JOIN {UserStats._meta.db_table} s '
+            'ON s.user_id = f.author_id '
+            f'WHERE COALESCE(s.followers_count, 0) < %s {where}',
+            [settings.TIMELINE_FANOUT_LIMIT, *params]
+        )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Пагинатор ленты подписок: записи TimelineEntry пользователя
+    вперемешку с постами популярных авторов (fan-out-on-read).
+
+    Смещение и LIMIT применяются в SQL к ключам (pub_date, id) обоих
+    источников, и посты читаются только для найденной страницы.
+    """
+
+    def __init__(self, user, per_page):
+        self.entries = TimelineEntry.objects.filter(user=user)
+        celebrities = celebrity_ids(user)
+        self.celebrity_posts = Post.objects.filter(
+            author_id__in=celebrities
+        ) if celebrities else None
+        super().__init__(self.entries, per_page)
+
+    @property
+    def count(self):
+        count = cached_count(self.entries)
+        if self.celebrity_posts is not None:
+            count += cached_count(self.celebrity_posts)
+        return count
+
+    def keys_query(self, descending, cursor=None):
+        """Ключи (pub_date, id) постов ленты в порядке обхода."""
+        keys = after_cursor(
+            self.entries, ('pub_date', 'post_id'), descending, cursor
+        ).values_list('pub_date', 'post_id').order_by()
+        if self.celebrity_posts is not None:
+            # Пост мог попасть в ленту до того, как автор стал
+            # популярным: UNION убирает такой повтор.
+            keys = keys.union(after_cursor(
+                self.celebrity_posts, self.keys, descending, cursor
+            ).values_list('pub_date', 'pk').order_by())
+        prefix = '-' if descending else ''
+        return keys.order_by(prefix + 'pub_date', prefix + 'post_id')
+
+    def _rows(self, descending, cursor=None, offset=0):
+        post_ids = [
+            post_id for _, post_id in self.keys_query(
+                descending, cursor
+            )[offset:offset + self.per_page + 1]
+        ]
+        rows = feed(Post.objects.filter(pk__in=post_ids), 'group')
+        return sorted(
+            rows,
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=descending
+        )
@@ -0,0 +1,71 @@
+"""Проверка загружаемых картинок без декодирования.
+
+BoundedUploadHandler пишет каждую загрузку во временный файл и перестаёт
+писать, когда она превышает UPLOAD_MAX_IMAGE_SIZE: остаток дочитывается,
+чтобы пользователь увидел ошибку формы. Запрос больше
+UPLOAD_MAX_REQUEST_SIZE не читается вовсе, его отвергает
+core.middleware.UploadLimitMiddleware. Затем по заголовку
+картинки проверяются формат и число пикселей: бомба вида «крошечный PNG
+на 50000x50000» отвергается раньше, чем Pillow начнёт её распаковывать.
+PostForm выводит ошибку проверки и не передаёт такой файл ImageField.
+Слишком большие, но допустимые оригиналы уменьшает воркер,
+см. thumbnails.shrink.
+"""
+import warnings
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+ERROR = 'upload_error'
+
+
+def check(upload):
+    """Текст ошибки для загрузки или None, если она допустима."""
+    if hasattr(upload, ERROR):
+        return getattr(upload, ERROR)
+    if upload.size > settings.UPLOAD_MAX_IMAGE_SIZE:
+        return (
+            'Файл больше '
+            f'{filesizeformat(settings.UPLOAD_MAX_IMAGE_SIZE)}.'
+        )
+    try:
+        # Image.open читает только заголовок; предупреждение о бомбе —
+        # уже повод отказать.
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(upload) as image:
+                format, (width, height) = image.format, image.size
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        return 'Слишком большая картинка.'
+    except Exception:
+        return 'Загрузите правильное изображение.'
+    finally:
+        upload.seek(0)
+    if format not in settings.UPLOAD_IMAGE_FORMATS:
+        return f'Формат {format} не поддерживается.'
+    if width * height > settings.UPLOAD_MAX_IMAGE_PIXELS:
+        return (
+            f'Картинка {width}x{height} больше '
+            f'{settings.UPLOAD_MAX_IMAGE_PIXELS // 10 ** 6} мегапикселей.'
+        )
+    return None
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Загрузка во временный файл не больше UPLOAD_MAX_IMAGE_SIZE байт
+    с проверкой заголовка картинки."""
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_IMAGE_SIZE:
+            # Остаток запроса читается, но на диск не пишется; file_size
+            # всё равно получит полный размер и check его отвергнет.
+            # Дочитывать приходится не больше UPLOAD_MAX_REQUEST_SIZE.
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        setattr(upload, ERROR, check(upload))
+        return upload
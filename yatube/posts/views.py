@@ -1,57 +1,178 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404, render, redirect
+from django.utils.http import urlencode
 
+from . import export, feeds, search, stats, thumbnails
+from .feed_cache import feed_cache
 from .forms import PostForm, CommentForm
 from .models import User, Group, Post, Follow
+from .page_cache import conditional_feed
+from .paginators import CursorPaginator
+from .timeline import TimelinePaginator
 
-from yatube.settings import POSTS_ON_PAGE
+from core.db import retry_on_locked
+from yatube.settings import COMMENTS_ON_PAGE, POSTS_ON_PAGE
 
 
-def page_of_paginator(request, post_list):
-    paginator = Paginator(post_list, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def page_of_paginator(request, post_list, count=None):
+    return page_of(
+        request, CursorPaginator(post_list, POSTS_ON_PAGE, count=count)
+    )
+
+
+def page_of(request, paginator):
+    page_obj = paginator.get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
     return page_obj
 
 
+def group_feeds(request, slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return pk and [f'group:{pk}']
+
+
+def profile_feeds(request, username):
+    pk = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    return pk and [f'profile:{pk}', f'stats:{pk}']
+
+
+def detail_feeds(request, post_id):
+    pk = Post.objects.filter(pk=post_id).values_list('pk', flat=True).first()
+    return pk and [f'post:{pk}']
+
+
+@conditional_feed(lambda request: ['index'])
 def index(request):
     return render(request, 'posts/index.html', {
-        'page_obj': page_of_paginator(request, Post.objects.all())
+        'page_obj': page_of_paginator(request, feeds.index_feed()),
+        **feed_cache(request, 'index'),
     })
 
 
+@conditional_feed(group_feeds)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': page_of_paginator(request, group.posts.all())
+        'page_obj': page_of_paginator(request, feeds.group_feed(group)),
+        **feed_cache(request, f'group:{group.pk}'),
     })
 
 
+@conditional_feed(profile_feeds)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = (
-        request.user.is_authenticated and request.user != username
-        and Follow.objects.filter(author=author, user=request.user).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
     )
+    author_stats = stats.for_user(author)
     return render(request, 'posts/profile.html', {
         'author': author,
-        'following': following,
-        'page_obj': page_of_paginator(request, author.posts.all()),
+        'stats': author_stats,
+        'page_obj': page_of_paginator(
+            request, feeds.profile_feed(author), author_stats.posts_count
+        ),
+        **feed_cache(request, f'profile:{author.pk}'),
     })
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'extra_query': urlencode({'q': query}),
+        'page_obj': page_of(
+            request, search.paginator(query, POSTS_ON_PAGE)
+        ),
+    })
+
+
+def comments_page(post_id, after=None):
+    return CursorPaginator(
+        feeds.comments_feed(post_id), COMMENTS_ON_PAGE,
+        keys=('created', 'pk')
+    ).get_page(after=after)
+
+
+@conditional_feed(detail_feeds)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(feeds.post_detail_queryset(), pk=post_id)
     form = CommentForm(request.POST or None)
     return render(request, 'posts/post_detail.html', {
         'post': post,
         'form': form,
+        # Остальные комментарии подгружает post_comments.
+        'comments': comments_page(post.pk),
+        **feed_cache(request, f'post:{post.pk}'),
     })
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев: фрагмент HTML или JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(post.pk, request.GET.get('after'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    return render(request, 'posts/includes/comment_list.html', {
+        'post': post,
+        'comments': comments,
+        **feed_cache(request, f'post:{post.pk}'),
+    })
+
+
+@staff_member_required
+def export_records(request, kind):
+    """Выгрузка для аналитики потоком: ?format=ndjson|csv, since, until,
+    group (slug) и gzip=1."""
+    if kind not in export.KINDS:
+        raise Http404
+    format = request.GET.get('format', 'ndjson')
+    if format not in export.FORMATS:
+        return HttpResponseBadRequest(f'Неизвестный формат: {format}')
+    try:
+        since, until = (
+            value and export.parse_moment(value)
+            for value in (request.GET.get('since'), request.GET.get('until'))
+        )
+        rows = export.records(kind, since, until, request.GET.get('group'))
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    gzip = bool(request.GET.get('gzip'))
+    filename = f'{kind}.{format}' + ('.gz' if gzip else '')
+    response = StreamingHttpResponse(
+        export.stream(kind, rows, format, gzip),
+        content_type=(
+            'application/gzip' if gzip
+            else f'{export.FORMATS[format]}; charset=utf-8'
+        )
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
+@retry_on_locked
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -62,10 +183,13 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    thumbnails.schedule(post)
     return redirect('posts:profile', request.user)
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, id=post_id)
@@ -78,6 +202,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post.id)
     return render(
         request,
@@ -87,6 +213,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -99,14 +227,19 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_feed(lambda request: ['index', f'follow:{request.user.pk}'])
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
     return render(request, 'posts/follow.html', {
-        'page_obj': page_of_paginator(request, posts),
+        'page_obj': page_of(
+            request, TimelinePaginator(request.user, POSTS_ON_PAGE)
+        ),
+        **feed_cache(request, 'index', f'follow:{request.user.pk}'),
     })
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
@@ -119,6 +252,8 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def profile_unfollow(request, username):
     # Отписка
     Follow.objects.filter(
@@ -0,0 +1,76 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from tasks.queue import work
+
+
+def worker(stop, interval, burst):
+    try:
+        work(stop, interval, burst)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # У каждого потока и процесса своё подключение к БД.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Сколько задач выполнять одновременно.'
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+            help='Потоки для задач с вводом-выводом, процессы — '
+                 'для задач, занятых процессором.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах, когда готовых задач нет.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда готовых задач не останется.'
+        )
+
+    def handle(self, *args, **options):
+        if options['pool'] == 'process':
+            # Дочерние процессы не должны делить подключение родителя.
+            connections.close_all()
+            stop = multiprocessing.Event()
+            pool = [
+                multiprocessing.Process(
+                    target=worker, name=f'worker-{number}',
+                    args=(stop, options['interval'], options['burst'])
+                )
+                for number in range(options['workers'])
+            ]
+        else:
+            stop = threading.Event()
+            pool = [
+                threading.Thread(
+                    target=worker, name=f'worker-{number}',
+                    args=(stop, options['interval'], options['burst'])
+                )
+                for number in range(options['workers'])
+            ]
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        self.stdout.write(
+            f'Воркеров: {len(pool)} ({options["pool"]}), Ctrl+C — выход.'
+        )
+        for process in pool:
+            process.start()
+        try:
+            for process in pool:
+                process.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for process in pool:
+                process.join()
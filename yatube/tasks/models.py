@@ -0,0 +1,43 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Фоновая задача: вызов функции с декоратором @task в runworker.
+
+    Выполненные задачи удаляются, в таблице остаются ждущие,
+    выполняемые и упавшие после всех попыток.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    payload = models.TextField('Аргументы (JSON)')
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Попыток не больше')
+    run_at = models.DateTimeField('Выполнить не раньше')
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        ordering = ('run_at', 'pk')
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='task_status_run_at_idx'
+            ),
+        ]
+        verbose_name_plural = 'Задачи'
+        verbose_name = 'Задача'
+
+    def __str__(self):
+        return f'{self.name} [{self.get_status_display()}]'
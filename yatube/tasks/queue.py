@@ -0,0 +1,140 @@
+"""Очередь фоновых задач в БД.
+
+Функция с декоратором @task получает метод delay(*args, **kwargs): он
+записывает строку Task с путём к функции и аргументами в JSON в текущей
+транзакции, и воркер увидит задачу только вместе с данными, ради которых
+она поставлена. runworker забирает готовые задачи условным UPDATE,
+выполняет и при ошибке повторяет с растущей задержкой. Выполненные
+задачи удаляются, упавшие после всех попыток остаются для разбора.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(max_attempts=None, unique=False):
+    """Делает функцию задачей очереди.
+
+    Аргументы задачи должны сериализоваться в JSON. С unique=True задача
+    не ставится повторно, пока такая же ждёт в очереди или выполняется.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def delay(*args, **kwargs):
+            return enqueue(
+                name, args, kwargs,
+                max_attempts=max_attempts, unique=unique
+            )
+        func.task_name = name
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=None, unique=False):
+    """Ставит задачу в очередь; None, если она не записана."""
+    payload = json.dumps(
+        {'args': list(args), 'kwargs': kwargs or {}}, sort_keys=True
+    )
+    if settings.TASKS_EAGER:
+        call(name, payload)
+        return None
+    if unique and Task.objects.filter(
+        name=name, payload=payload, status__in=(Task.QUEUED, Task.RUNNING)
+    ).exists():
+        return None
+    return Task.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_at=timezone.now(),
+    )
+
+
+def call(name, payload):
+    payload = json.loads(payload)
+    return import_string(name)(*payload['args'], **payload['kwargs'])
+
+
+def claim():
+    """Забирает первую готовую задачу; None, если таких нет."""
+    now = timezone.now()
+    ready = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).values_list('pk', flat=True)
+    for pk in ready[:settings.TASKS_CLAIM_BATCH]:
+        # Задачу мог забрать другой воркер между SELECT и UPDATE.
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        ):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run(task):
+    """Выполняет забранную задачу и записывает итог."""
+    try:
+        with transaction.atomic():
+            call(task.name, task.payload)
+    except Exception:
+        fail(task, traceback.format_exc())
+    else:
+        Task.objects.filter(pk=task.pk).delete()
+
+
+def fail(task, error):
+    tasks = Task.objects.filter(pk=task.pk)
+    if task.attempts < task.max_attempts:
+        backoff = settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+        tasks.update(
+            status=Task.QUEUED, locked_at=None, last_error=error,
+            run_at=timezone.now() + timedelta(seconds=backoff)
+        )
+        logger.warning(
+            'Задача %s упала, повтор через %s с', task, backoff
+        )
+    else:
+        tasks.update(status=Task.FAILED, locked_at=None, last_error=error)
+        logger.error('Задача %s не выполнена:\n%s', task, error)
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, чей воркер пропал, не закончив их."""
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS_LOCK_TIMEOUT
+        ),
+    ).update(status=Task.QUEUED, locked_at=None)
+
+
+def work(stop, interval=1.0, burst=False):
+    """Цикл воркера до события stop; с burst — пока есть готовые задачи.
+
+    Возвращает число выполненных задач.
+    """
+    done = 0
+    while not stop.is_set():
+        task = claim()
+        if task is None:
+            if requeue_stale():
+                continue
+            if burst:
+                break
+            stop.wait(interval)
+            continue
+        run(task)
+        done += 1
+    return done
@@ -0,0 +1,149 @@
+import threading
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks import queue
+from tasks.models import Task
+
+User = get_user_model()
+calls = []
+
+
+@queue.task()
+def remember(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@queue.task(max_attempts=2)
+def explode():
+    raise ValueError('сбой')
+
+
+@queue.task(unique=True)
+def only_once(value):
+    calls.append(value)
+
+
+def thread_run(thread):
+    thread.run()
+
+
+def work_off():
+    return queue.work(threading.Event(), burst=True)
+
+
+@override_settings(TASKS_EAGER=False, TASKS_RETRY_DELAY=10)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_stores_task(self):
+        '''delay записывает задачу и не выполняет её сразу'''
+        task = remember.delay(1, suffix='!')
+        self.assertEqual(task.name, 'tasks.test_queue.remember')
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(calls, [])
+
+    def test_worker_runs_and_deletes_task(self):
+        '''Воркер выполняет задачи и удаляет выполненные'''
+        remember.delay(1, suffix='!')
+        remember.delay(2)
+        self.assertEqual(work_off(), 2)
+        self.assertEqual(calls, ['1!', '2'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_retried_with_backoff(self):
+        '''Упавшая задача ждёт повтора, задержка растёт вдвое'''
+        task = explode.delay()
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            work_off()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('ValueError', task.last_error)
+        delay = task.run_at - timezone.now()
+        self.assertTrue(timedelta(seconds=9) < delay <= timedelta(seconds=10))
+        # До срока повтора воркер задачу не берёт.
+        self.assertEqual(work_off(), 0)
+
+    def test_task_fails_after_max_attempts(self):
+        '''После max_attempts задача остаётся упавшей'''
+        task = explode.delay()
+        for _ in range(2):
+            Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+            with self.assertLogs('tasks.queue', 'WARNING'):
+                work_off()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        self.assertEqual(work_off(), 0)
+
+    def test_unique_task_not_duplicated(self):
+        '''Уникальная задача не ставится, пока такая же в очереди'''
+        self.assertIsNotNone(only_once.delay('a'))
+        self.assertIsNone(only_once.delay('a'))
+        self.assertIsNotNone(only_once.delay('b'))
+        work_off()
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertIsNotNone(only_once.delay('a'))
+
+    def test_claimed_task_not_taken_twice(self):
+        '''Забранную задачу другой воркер не получает'''
+        remember.delay(1)
+        self.assertIsNotNone(queue.claim())
+        self.assertIsNone(queue.claim())
+
+    def test_stale_task_requeued(self):
+        '''Задача пропавшего воркера возвращается в очередь'''
+        remember.delay(1)
+        queue.claim()
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(work_off(), 1)
+        self.assertEqual(calls, ['1'])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        '''С TASKS_EAGER задача выполняется при постановке'''
+        self.assertIsNone(remember.delay(3))
+        self.assertEqual(calls, ['3'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_runworker_burst(self):
+        '''runworker --burst выполняет очередь и завершается'''
+        remember.delay(4)
+        # Потоки воркера не видят транзакцию теста: выполняем в этом.
+        start = mock.patch.object(threading.Thread, 'start', thread_run)
+        join = mock.patch.object(threading.Thread, 'join')
+        close = mock.patch('tasks.management.commands.runworker.connection')
+        with start, join, close:
+            call_command('runworker', '--burst', stdout=StringIO())
+        self.assertEqual(calls, ['4'])
+
+
+@override_settings(TASKS_EAGER=False)
+class PasswordResetTests(TestCase):
+    def test_reset_email_sent_by_worker(self):
+        '''Письмо сброса пароля уходит из очереди, а не из запроса'''
+        User.objects.create_user(
+            username='Ivan', email='ivan@example.com', password='secret123'
+        )
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'ivan@example.com'}
+        )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Task.objects.get().name, 'users.tasks.send_email')
+        work_off()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ivan@example.com'])
+        self.assertIn('/reset/', mail.outbox[0].body)
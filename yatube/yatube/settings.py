@@ -46,15 +46,19 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'tasks.apps.TasksConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.UploadLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,7 +68,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -89,8 +93,21 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Сколько секунд ждать снятия блокировки записи.
+        'OPTIONS': {'timeout': 20},
+        'CONN_MAX_AGE': 60,
     }
 }
+# Реплики для чтения лент, см. core/routers.py.
+DATABASE_REPLICAS = []
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
 
 
 # Password validation
@@ -133,12 +150,18 @@ USE_TZ = True
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        # Страницы лент целиком, фрагменты и счётчики пагинатора:
+        # 300 записей по умолчанию вытесняли бы страницы друг другом.
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
 }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# Имена с хешем и сжатые копии, см. core/static.py.
+STATICFILES_STORAGE = 'core.static.CompressedManifestStorage'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -146,4 +169,73 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+PAGINATOR_COUNT_TIMEOUT = 60
+FEED_CACHE_TIMEOUT = 60 * 60 * 4
+# Сколько секунд прокси может отдавать ленту анонимам без проверки.
+FEED_PUBLIC_MAX_AGE = 10
+# Длина выдержки из текста поста для заголовка страницы и админки.
+TEXT_EXCERPT_LENGTH = 80
+# Посты авторов с таким числом подписчиков не раскладываются по лентам.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL = 500
+TIMELINE_BATCH_SIZE = 1000
+# Ширины вариантов картинки поста для srcset, по возрастанию.
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+# Загрузки пишутся во временный файл и проверяются по заголовку,
+# см. posts/uploads.py.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedUploadHandler']
+UPLOAD_MAX_IMAGE_SIZE = 10 * 1024 * 1024
+# Больший запрос получает 413 без чтения тела; до этого размера лишнее
+# дочитывается ради ошибки формы.
+UPLOAD_MAX_REQUEST_SIZE = 2 * UPLOAD_MAX_IMAGE_SIZE
+UPLOAD_MAX_IMAGE_PIXELS = 40 * 10 ** 6
+UPLOAD_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Оригиналы с большей стороной длиннее воркер уменьшает.
+POST_IMAGE_MAX_SIDE = 2880
+# /metrics/ видят staff и сборщик с заголовком
+# «Authorization: Bearer <токен>». Адрес клиента не проверяется:
+# за прокси все запросы приходят с 127.0.0.1.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_SERVER_TIMING = True
+# Прагмы SQLite для каждого подключения, см. core/db.py.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+DB_LOCK_RETRIES = 3
+DB_LOCK_RETRY_DELAY = 0.05
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:follow_index',
+    'posts:search',
+    'posts:export',
+)
+# После записи клиент столько секунд читает из основной БД.
+REPLICA_STICKY_COOKIE = 'primary_reads'
+REPLICA_STICKY_SECONDS = 10
+# Сколько строк выгрузки читать из БД за раз, см. posts/export.py.
+EXPORT_CHUNK_SIZE = 2000
+# Очередь фоновых задач, см. tasks/queue.py. С TASKS_EAGER задачи
+# выполняются сразу при постановке.
+TASKS_EAGER = False
+TASKS_MAX_ATTEMPTS = 3
+# Задержка первого повтора в секундах, дальше она удваивается.
+TASKS_RETRY_DELAY = 10
+# Задача, которую воркер держит дольше, возвращается в очередь.
+TASKS_LOCK_TIMEOUT = 60 * 10
+TASKS_CLAIM_BATCH = 10
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+# Кто передаёт байты файлов из MEDIA_ROOT, см. core/media.py:
+# None — сам Django, 'x-accel-redirect' — nginx через внутренний
+# location MEDIA_ACCEL_PREFIX, 'x-sendfile' — Apache или lighttpd.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
@@ -3,11 +3,13 @@ from django.contrib import admin
 from django.urls import include, path
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.views import media_view, metrics_view, static_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include('posts.urls', namespace='posts')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
@@ -18,7 +20,14 @@ handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.csrf_failure'
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+# Внешние MEDIA_URL и STATIC_URL (CDN) обслуживаются без Django.
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>', media_view,
+        name='media'
+    ))
+if settings.STATIC_URL.startswith('/'):
+    urlpatterns.append(path(
+        settings.STATIC_URL.lstrip('/') + '<path:path>', static_view,
+        name='static'
+    ))